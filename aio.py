@@ -0,0 +1,201 @@
+"""
+Asyncio sessions for players that wait on I/O (Python 3 only)
+"""
+import asyncio
+import copy
+from games.game import Session
+from players import Player
+from renderers import NullRenderer
+from trainer import BotTrainer, GenerationStats, _result_fields
+
+
+class AsyncPlayer(Player):
+    """
+    Base player whose next_move is a coroutine
+    """
+    async def next_move(self, game, cursor):
+        """
+        Retrieve the next move for this player in this game
+        """
+        raise NotImplementedError
+
+
+class DelayedPlayer(AsyncPlayer):
+    """
+    Stub remote player: wraps a local player and answers after a delay
+    """
+    def __init__(self, player, latency):
+        self.player = player
+        self.latency = latency
+
+    async def next_move(self, game, cursor):
+        await asyncio.sleep(self.latency)
+        return self.player.next_move(game, cursor)
+
+
+class AsyncSession(Session):
+    """
+    Session that awaits its player, so many can share one event loop. There
+    is no outcome cache, a remote player's plan isn't known up front.
+    """
+    def __init__(self, *args, **kwargs):
+        super(AsyncSession, self).__init__(*args, **kwargs)
+        if self.outcome_cache is not None:
+            raise ValueError('AsyncSession has no outcome cache')
+
+    async def play(self, max_turns=None, start_turn=1):
+        """
+        Loop over a game, start_turn > 1 continues a restored game
+        """
+        headless = self.renderer is None
+        if not headless:
+            self.render()
+        turn = start_turn
+        self.cursor = self.Cursor(start_turn - 1)
+        self.ticks = 0
+        if not self.game.in_progress():
+            return self.result(turn - 1)
+        for policy in self.stop_policies:
+            policy.reset(self)
+        finished = False
+        stopped = False
+        while max_turns is None or turn <= max_turns:
+            move = self.player.next_move(self.game, self.cursor)
+            if asyncio.iscoroutine(move):
+                move = await move
+            self.game.tick(move)
+            if not headless:
+                self.render()
+            finished = not self.game.in_progress()
+            if finished:
+                break
+            stopped = bool(self.stop_policies) and any(
+                policy.should_stop(self, turn, max_turns)
+                for policy in self.stop_policies
+            )
+            if stopped:
+                break
+            turn += 1
+        self.ticks = turn - start_turn + (finished or stopped)
+        if stopped:
+            if max_turns is not None:
+                turn = max_turns + 1
+            result = self.result(turn)
+            result.stopped = True
+            return result
+        return self.result(turn)
+
+
+class AsyncBotTrainer(BotTrainer):
+    """
+    Trainer that plays a generation's sessions concurrently on one event
+    loop, bot_wrapper (e.g. a DelayedPlayer factory) adapts bots to async
+    players. Sessions are played here from the start: worker pools, batch
+    and remote evaluation, prefix and outcome caches and rendering every
+    session don't apply and are rejected.
+    """
+    def __init__(self, *args, **kwargs):
+        self.max_concurrency = kwargs.pop('max_concurrency', 100)
+        self.bot_wrapper = kwargs.pop('bot_wrapper', None)
+        super(AsyncBotTrainer, self).__init__(*args, **kwargs)
+        unsupported = [
+            name for name, value in (
+                ('workers', bool(self.workers) and self.workers > 1),
+                ('batch_factory', self.batch_factory is not None),
+                ('evaluator', self.evaluator is not None),
+                ('prefix_cache_size', self.prefix_cache is not None),
+                ('outcome_cache_size', self.outcome_cache is not None),
+                ('render_every', (
+                    bool(self.render_every) and
+                    self.game_renderer_factory is not NullRenderer)),
+            )
+            if value
+        ]
+        if unsupported:
+            raise ValueError('AsyncBotTrainer does not support {}'.format(
+                ', '.join(unsupported)))
+
+    async def test_bot_async(self, bot, semaphore, best=None):
+        """
+        Test the bot against the game without blocking the loop, stop
+        policies may cut it short once it can't beat best
+        """
+        player = self.bot_wrapper(bot) if self.bot_wrapper else bot
+        async with semaphore:
+            # Policies keep per-session state, concurrent sessions each
+            # need their own
+            session = AsyncSession(
+                self.game_factory(), player,
+                stop_policies=copy.deepcopy(self.stop_policies), best=best)
+            result = await session.play(self.max_turns)
+        self.profiler.count('sessions')
+        self.profiler.count('ticks', session.ticks)
+        return result
+
+    async def test_generation_async(self, bots, min_result):
+        """
+        Test a set of bots concurrently, the winner is picked in bot order
+        exactly like the serial trainer
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = [None] * len(bots)
+        duplicate_of = [None] * len(bots)
+        stats = GenerationStats()
+        keys, pending = self._dedup(bots, results, duplicate_of, stats)
+        self.profiler.count('duplicates', stats.duplicates)
+        with self.profiler.stage('evaluate'):
+            tested = await asyncio.gather(*[
+                self.test_bot_async(bots[bot_id], semaphore, min_result)
+                for bot_id in pending
+            ])
+        for bot_id, result in zip(pending, tested):
+            results[bot_id] = _result_fields(result)
+        del tested
+        for bot_id, bot in enumerate(bots):
+            result = Session.Result(
+                *self._known_fields(results, duplicate_of, bot_id))
+            self._share(keys, results, bot_id, result)
+            stats.add(result)
+            if result > min_result:
+                result.bot_id = bot_id
+                result.player = bot
+                min_result = result
+        self.last_stats = stats
+        return min_result
+
+    def test_generation(self, bots, min_result, render_context, parent=None):
+        return asyncio.run(self.test_generation_async(bots, min_result))
+
+    async def breed_best_bot_async(self, checkpoint=None):
+        """
+        Breeds the best bot from inside a running event loop, optionally
+        continuing from a checkpoint (see load_checkpoint)
+        """
+        generations, best_bot, best_result, _, bots = self._start(
+            checkpoint)
+        if bots is None:
+            return generations, best_result
+        progress_renderer = self.progress_renderer_factory()
+        game_renderer = self.game_renderer_factory()
+        with progress_renderer.render_context() as progress_ctx:
+            with game_renderer.render_context() as game_ctx:
+                while True:
+                    self.profiler.start_generation(generations)
+                    self._do_progress(generations, best_result, progress_ctx)
+                    next_best_result = await self.test_generation_async(
+                        bots, best_result)
+                    if next_best_result > best_result:
+                        best_result = next_best_result
+                        best_bot = best_result.player
+                        self._show_champion(best_bot, game_ctx)
+                    if best_result.finished:
+                        break
+                    self._checkpoint(generations, best_result)
+                    generations += 1
+                    if generations > self.max_generations:
+                        break
+                    bots = self._breed(best_bot)
+            self._do_progress(
+                generations, best_result, progress_ctx, force=True)
+        self.profiler.finish()
+        return generations, best_result
@@ -0,0 +1,55 @@
+"""
+Run the benchmarks: python -m bench [--baseline FILE] [--output FILE]
+"""
+from __future__ import print_function
+from argparse import ArgumentParser
+import json
+import sys
+from bench.benchmarks import compare, environment, run
+
+
+def main():
+    """
+    Benchmark entry point
+    """
+    parser = ArgumentParser(description='Training pipeline benchmarks')
+    parser.add_argument(
+        'names', nargs='*', help='only run benchmarks with these prefixes')
+    parser.add_argument('--output', help='save results as JSON')
+    parser.add_argument('--baseline', help='compare against saved results')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.5,
+        help='allowed slowdown against the baseline (default 0.5)')
+    parser.add_argument(
+        '--min-time', type=float, default=0.5,
+        help='seconds per run (default 0.5)')
+    parser.add_argument(
+        '--repeat', type=int, default=7,
+        help='runs per benchmark, the median rate counts (default 7)')
+    args = parser.parse_args()
+
+    results = run(args.names, args.min_time, args.repeat)
+    for name, rate in sorted(results.items()):
+        print('{:32} {:14.1f} /s'.format(name, rate))
+    setup = environment()
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(
+                {'environment': setup, 'rates': results}, output, indent=2,
+                sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['environment'] != setup:
+            print('Baseline ran with {python} on {host} ({cpus} cpus), '
+                  'rates may not compare'.format(**baseline['environment']))
+        regressions = compare(results, baseline['rates'], args.tolerance)
+        for name, before, after in regressions:
+            print('REGRESSION {}: {:.1f} -> {:.1f} /s ({:+.0%})'.format(
+                name, before, after, after / before - 1))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
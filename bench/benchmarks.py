@@ -0,0 +1,186 @@
+"""
+Throughput benchmarks for the training pipeline
+"""
+from multiprocessing import cpu_count
+from timeit import default_timer
+import platform
+import random
+from games.game import Session
+from games.maze import Layout, Maze
+from neat.network import Network, Neuron
+from players import PlannedBot
+from trainer import BotTrainer
+
+
+def layouts():
+    """
+    Layout templates by name, each game plays on a copy
+    """
+    return {
+        'easy': Layout.from_string(Layout.EASY_STR),
+        'medium': Layout.from_string(Layout.MEDIUM_STR),
+        'generated_101': Layout.generate(101, 101, seed=0),
+        'generated_1001': Layout.generate(1001, 1001, seed=0),
+    }
+
+
+def measure(func, min_time=0.5, repeat=7):
+    """
+    Median rate of func() over a few runs, func returns how many operations
+    it did. The median shrugs off the odd run slowed by the machine.
+    """
+    rates = []
+    for _ in range(repeat):
+        operations = 0
+        start = default_timer()
+        elapsed = 0.0
+        while elapsed < min_time:
+            operations += func()
+            elapsed = default_timer() - start
+        rates.append(operations / elapsed)
+    return _median(rates)
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def _random_plans(rng, count, length):
+    return [
+        [rng.choice('WASD') for _ in range(length)] for _ in range(count)
+    ]
+
+
+def maze_ticks(template, rng):
+    """
+    Maze.tick calls per second
+    """
+    moves = [rng.choice('WASD') for _ in range(1000)]
+
+    def run():
+        game = Maze(template.copy())
+        for move in moves:
+            game.tick(move)
+        return len(moves)
+    return run
+
+
+def session_plays(template, rng):
+    """
+    Session.play calls per second (random 100 move plans)
+    """
+    plans = _random_plans(rng, 100, 100)
+
+    def run():
+        for plan in plans:
+            game = Maze(template.copy())
+            Session(game, PlannedBot(plan)).play(100)
+        return len(plans)
+    return run
+
+
+def generation_bots(template, rng):
+    """
+    Bots per second through BotTrainer.test_generation
+    """
+    def game_factory():
+        return Maze(template.copy())
+    trainer = BotTrainer(game_factory, PlannedBot, 100, 1)
+    bots = [PlannedBot(plan) for plan in _random_plans(rng, 100, 100)]
+
+    def run():
+        trainer.test_generation(bots, Session.Result.zero(), None)
+        return len(bots)
+    return run
+
+
+def _random_network(rng, mutations=50):
+    network = Network(
+        [Neuron() for _ in range(8)], [Neuron() for _ in range(4)])
+    for _ in range(mutations):
+        mutator = rng.choice(
+            [network.add_random_neuron, network.add_random_connection])
+        mutator(rng=rng)
+    return network
+
+
+def network_traversals(rng):
+    """
+    Network.traverse calls per second
+    """
+    network = _random_network(rng)
+
+    def run():
+        for _ in range(100):
+            network.traverse()
+        return 100
+    return run
+
+
+def network_clones(rng):
+    """
+    Network.deep_copy calls per second
+    """
+    network = _random_network(rng)
+
+    def run():
+        for _ in range(1000):
+            network.deep_copy()
+        return 1000
+    return run
+
+
+def benchmarks(rng):
+    """
+    All benchmarks by name, each a function returning operations done
+    """
+    suite = {}
+    for name, template in sorted(layouts().items()):
+        suite['maze_tick/' + name] = maze_ticks(template, rng)
+        suite['session_play/' + name] = session_plays(template, rng)
+        suite['test_generation/' + name] = generation_bots(template, rng)
+    suite['network_traverse'] = network_traversals(rng)
+    suite['network_deep_copy'] = network_clones(rng)
+    return suite
+
+
+def environment():
+    """
+    Where the benchmarks ran, rates only compare on the same setup
+    """
+    return {
+        'python': '{} {}'.format(
+            platform.python_implementation(), platform.python_version()),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'cpus': cpu_count(),
+    }
+
+
+def run(names=None, min_time=0.5, repeat=7, seed=0):
+    """
+    Run the selected benchmarks, returns operations per second by name
+    """
+    suite = benchmarks(random.Random(seed))
+    results = {}
+    for name in sorted(suite):
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        results[name] = measure(suite[name], min_time, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Benchmarks that got slower than the baseline by more than tolerance
+    (a fraction), as (name, baseline rate, new rate)
+    """
+    return [
+        (name, baseline[name], rate)
+        for name, rate in sorted(results.items())
+        if name in baseline and rate < baseline[name] * (1 - tolerance)
+    ]
@@ -0,0 +1,50 @@
+"""
+Bounded caches for reusing simulation work
+"""
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Mapping that forgets the least recently used entry once full
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """
+        Retrieve an entry and mark it as recently used
+        """
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store an entry, evicting the oldest ones past max_size
+        """
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        """
+        Fraction of lookups that found an entry
+        """
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
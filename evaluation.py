@@ -0,0 +1,181 @@
+"""
+Bot evaluation service: trainers submit serialized bots to a job queue and
+worker processes (local or remote) send back compact results
+"""
+from multiprocessing import Process
+from multiprocessing.managers import BaseManager
+try:
+    from queue import Empty, Queue
+except ImportError:
+    from Queue import Empty, Queue
+from games.game import Session
+from games.maze import Layout, Maze
+from players import NeatBot, PlannedBot
+
+DEFAULT_ADDRESS = ('127.0.0.1', 50505)
+DEFAULT_AUTHKEY = b'machine-learning'
+
+# Layouts workers know by id, 'generated:<width>:<height>:<seed>' also works
+LAYOUTS = {
+    'easy': Layout.EASY_STR,
+    'medium': Layout.MEDIUM_STR,
+}
+
+_jobs = Queue()
+_results = Queue()
+
+
+def _get_jobs():
+    return _jobs
+
+
+def _get_results():
+    return _results
+
+
+class EvaluationManager(BaseManager):
+    """
+    Broker serving the job and result queues
+    """
+    pass
+
+
+EvaluationManager.register('get_jobs', callable=_get_jobs)
+EvaluationManager.register('get_results', callable=_get_results)
+
+
+def start_broker(address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+    """
+    Start a local broker process, shut it down with .shutdown()
+    """
+    manager = EvaluationManager(address, authkey)
+    manager.start()
+    return manager
+
+
+def connect(address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+    """
+    Connect to a running broker
+    """
+    manager = EvaluationManager(address, authkey)
+    manager.connect()
+    return manager
+
+
+def encode_bot(bot):
+    """
+    Compact picklable form of a bot's genome
+    """
+    if isinstance(bot, PlannedBot):
+        return 'plan', bot.moves
+    if isinstance(bot, NeatBot):
+        return 'network', bot.network
+    raise TypeError('Cannot serialize {}'.format(type(bot).__name__))
+
+
+def decode_bot(genome):
+    """
+    Rebuild a bot from encode_bot output
+    """
+    kind, data = genome
+    if kind == 'plan':
+        return PlannedBot(data)
+    if kind == 'network':
+        return NeatBot(data)
+    raise ValueError('Unknown genome kind {}'.format(kind))
+
+
+def load_layout(layout_id):
+    """
+    Compile a layout from its id
+    """
+    if layout_id.startswith('generated:'):
+        width, height, seed = [int(_) for _ in layout_id.split(':')[1:]]
+        return Layout.generate(width, height, seed)
+    return Layout.from_string(LAYOUTS[layout_id])
+
+
+def run_worker(address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+    """
+    Evaluate jobs until a None job arrives, layouts are compiled once per
+    worker
+    """
+    manager = connect(address, authkey)
+    jobs = manager.get_jobs()
+    results = manager.get_results()
+    layouts = {}
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, layout_id, genome, max_turns = job
+        if layout_id not in layouts:
+            layouts[layout_id] = load_layout(layout_id)
+        game = Maze(layouts[layout_id].copy())
+        result = Session(game, decode_bot(genome)).play(max_turns)
+        results.put((job_id, result.score, result.turns, result.finished))
+
+
+def start_workers(count, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+    """
+    Start worker processes on this machine
+    """
+    workers = []
+    for _ in range(count):
+        worker = Process(target=run_worker, args=(address, authkey))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+    return workers
+
+
+class RemoteEvaluator(object):
+    """
+    Trainer side of the service, see BotTrainer(evaluator=...).
+    Assumes it is the only client collecting results from the broker.
+    timeout is how many seconds to wait for each result, None waits
+    forever.
+    """
+    def __init__(
+            self, layout_id, address=DEFAULT_ADDRESS,
+            authkey=DEFAULT_AUTHKEY, timeout=60):
+        self.layout_id = layout_id
+        self.timeout = timeout
+        manager = connect(address, authkey)
+        self.jobs = manager.get_jobs()
+        self.results = manager.get_results()
+        self.next_job = 0
+
+    def evaluate(self, bots, max_turns):
+        """
+        Results for the bots, in bot order. Raises RuntimeError if the
+        workers fall silent for longer than the timeout.
+        """
+        first_job = self.next_job
+        self.next_job += len(bots)
+        for job_id, bot in enumerate(bots, first_job):
+            self.jobs.put((job_id, self.layout_id, encode_bot(bot), max_turns))
+        results = [None] * len(bots)
+        missing = len(bots)
+        while missing:
+            try:
+                job_id, score, turns, finished = self.results.get(
+                    timeout=self.timeout)
+            except Empty:
+                raise RuntimeError(
+                    '{} of {} results did not arrive within {}s'.format(
+                        missing, len(bots), self.timeout))
+            idx = job_id - first_job
+            # Stray results, e.g. from an earlier call that timed out, are
+            # dropped
+            if 0 <= idx < len(bots) and results[idx] is None:
+                results[idx] = Session.Result(score, turns, finished)
+                missing -= 1
+        return results
+
+    def stop_workers(self, count):
+        """
+        Ask count workers to exit
+        """
+        for _ in range(count):
+            self.jobs.put(None)
@@ -44,29 +44,76 @@ class Game(object):
         """
         raise NotImplementedError
 
+    def observe(self):
+        """
+        Fixed size feature vector of the game state, kept up to date by the
+        game itself (read only)
+        """
+        raise NotImplementedError
+
+    def state_key(self):
+        """
+        Compact hashable summary, equal keys play out the same from here on
+        """
+        raise NotImplementedError
+
+    def snapshot(self):
+        """
+        Capture the game state so it can be restored later
+        """
+        raise NotImplementedError
+
+    def restore(self, state):
+        """
+        Return to a state captured by snapshot
+        """
+        raise NotImplementedError
+
 
 class Session(object):
     """
     Let a player play a game
     """
+    class Cursor(object):
+        """
+        The player's place in this session, handed to every next_move call
+        so players keep no per-game state of their own
+        """
+        __slots__ = ('turn', 'data')
+
+        def __init__(self, turn=0):
+            # Moves the player has made so far
+            self.turn = turn
+            # Whatever the player keeps for this session only
+            self.data = None
+
     class Result(object):
         """
-        Holds session results
+        Holds session results, game and player are only kept when needed
+        (e.g. for a champion). A stopped result was cut short by a stop
+        policy.
         """
-        def __init__(self, game, player, score, turns, finished):
-            self.game = game
-            self.player = player
+        __slots__ = (
+            'score', 'turns', 'finished', 'bot_id', 'game', 'player',
+            'stopped')
+
+        def __init__(
+                self, score, turns, finished, bot_id=None, game=None,
+                player=None, stopped=False):
             self.score = score
             self.turns = turns
             self.finished = finished
+            self.bot_id = bot_id
+            self.game = game
+            self.player = player
+            self.stopped = stopped
 
         @classmethod
         def zero(cls):
             """
             Returns the least possible result
             """
-            # '' is > any int
-            return cls(None, None, 0, '', False)
+            return cls(0, float('inf'), False)
 
         def __gt__(self, other):
             if self.finished > other.finished:
@@ -79,33 +126,207 @@ class Session(object):
                         return True
             return False
 
-    def __init__(self, game, player, renderer):
+    def __init__(
+            self, game, player, renderer=None, outcome_cache=None,
+            stop_policies=(), best=None):
+        """
+        A renderer of None makes the session headless (no frames are built).
+        An outcome_cache (caches.LRUCache) skips replaying a plan from a
+        game state it has already seen, the game is then left as is.
+        stop_policies (StopPolicy) can cut the session short, e.g. once it
+        can no longer beat the best result so far.
+        """
         self.game = game
         self.player = player
         self.renderer = renderer
+        self.outcome_cache = outcome_cache
+        self.stop_policies = stop_policies
+        self.best = best
+        self.cursor = self.Cursor()
+        # game.tick calls the last play made
+        self.ticks = 0
 
-    def play(self, max_turns=None):
+    def play(self, max_turns=None, start_turn=1):
         """
-        Loop over a game
+        Loop over a game, start_turn > 1 continues a restored game
         """
-        self.render()
-        turn = 1
+        headless = self.renderer is None
+        if not headless:
+            self.render()
+        turn = start_turn
+        self.cursor = self.Cursor(start_turn - 1)
+        self.ticks = 0
+        if not self.game.in_progress():
+            return self.result(turn - 1)
+        for policy in self.stop_policies:
+            policy.reset(self)
+        # Outcome cache keys of the turns played, stored once the outcome
+        # is known
+        keys = [] if self._caches_outcomes() else None
+        result = None
         finished = False
+        stopped = False
         while max_turns is None or turn <= max_turns:
-            self.game.tick(self.player.next_move(self.game))
-            self.render()
+            if keys is not None:
+                key = self._outcome_key(max_turns, turn)
+                outcome = self.outcome_cache.get(key)
+                if outcome is not None:
+                    score, turns, won = outcome
+                    result = self.Result(
+                        score, turn - 1 + turns, won, game=self.game,
+                        player=self.player)
+                    break
+                keys.append((turn, key))
+            self.game.tick(self.player.next_move(self.game, self.cursor))
+            if not headless:
+                self.render()
             finished = not self.game.in_progress()
             if finished:
                 break
+            stopped = bool(self.stop_policies) and any(
+                policy.should_stop(self, turn, max_turns)
+                for policy in self.stop_policies
+            )
+            if stopped:
+                break
             turn += 1
+        self.ticks = turn - start_turn + (finished or stopped)
+        if stopped:
+            # Score it as if it ran out of turns, the outcome depended on
+            # the policies so it is not cached
+            if max_turns is not None:
+                turn = max_turns + 1
+            result = self.result(turn)
+            result.stopped = True
+            return result
+        if result is None:
+            result = self.result(turn)
+        if keys:
+            for key_turn, key in keys:
+                self.outcome_cache.put(key, (
+                    result.score, result.turns - key_turn + 1,
+                    result.finished))
+        return result
+
+    def _caches_outcomes(self):
+        """
+        Only players that know their remaining moves have outcome keys.
+        Rendered sessions are always played so every frame is shown.
+        """
+        return (
+            self.outcome_cache is not None and self.renderer is None and
+            hasattr(self.player, 'remaining_moves'))
+
+    def _outcome_key(self, max_turns, turn):
+        """
+        Key for the outcome cache: game state, the moves the player still
+        has planned and the turns left to play them. A player quits once
+        its plan runs out, so turns past that don't change the outcome.
+        """
+        moves = self.player.remaining_moves(self.cursor)
+        budget = len(moves) + 1
+        if max_turns is not None:
+            budget = min(budget, max_turns - turn + 1)
+        return self.game.state_key(), moves[:budget], budget
+
+    def result(self, turns):
+        """
+        Summarize the game after the given number of turns
+        """
         return self.Result(
-            self.game, self.player, self.game.score, turn, self.game.won())
+            self.game.score, turns, self.game.won(), game=self.game,
+            player=self.player)
 
     def render(self):
         """
         Render the game state
         """
         self.renderer.reset_frame()
-        self.game.render(self.renderer)
+        self.game.render_game(self.renderer)
         # Line break
         self.renderer.draw_text_array([''])
+        self.renderer.end_frame()
+
+
+class StopPolicy(object):
+    """
+    Decides when a session is hopeless and can stop early
+    """
+    # Decisions depend on the states seen since reset, so sessions can't
+    # resume from a cached prefix or outcome without changing them
+    needs_history = False
+
+    def reset(self, session):
+        """
+        Prepare for a new session
+        """
+        pass
+
+    def should_stop(self, session, turn, max_turns):
+        """
+        Called after every turn that did not end the game
+        """
+        raise NotImplementedError
+
+
+class StallPolicy(StopPolicy):
+    """
+    Stop after a number of consecutive moves that changed nothing (bad
+    moves, walking into walls)
+    """
+    needs_history = True
+
+    def __init__(self, max_stalls):
+        self.max_stalls = max_stalls
+        self.stalls = 0
+        self.last_key = None
+
+    def reset(self, session):
+        self.stalls = 0
+        self.last_key = session.game.state_key()
+
+    def should_stop(self, session, turn, max_turns):
+        key = session.game.state_key()
+        if key == self.last_key:
+            self.stalls += 1
+        else:
+            self.stalls = 0
+            self.last_key = key
+        return self.stalls >= self.max_stalls
+
+
+class CyclePolicy(StopPolicy):
+    """
+    Stop when the game returns to a state it was already in
+    """
+    needs_history = True
+
+    def __init__(self):
+        self.seen = set()
+
+    def reset(self, session):
+        self.seen = set([session.game.state_key()])
+
+    def should_stop(self, session, turn, max_turns):
+        key = session.game.state_key()
+        if key in self.seen:
+            return True
+        self.seen.add(key)
+        return False
+
+
+class BoundPolicy(StopPolicy):
+    """
+    Stop when even scoring on every remaining turn could not reach the best
+    score so far (assumes finishing also requires out-scoring it, as in
+    the maze where the goal ends the solution path)
+    """
+    def __init__(self, points_per_turn=1):
+        self.points_per_turn = points_per_turn
+
+    def should_stop(self, session, turn, max_turns):
+        if max_turns is None or session.best is None:
+            return False
+        best_possible = (
+            session.game.score + (max_turns - turn) * self.points_per_turn)
+        return best_possible < session.best.score
@@ -1,6 +1,9 @@
 """
 Simple Maze Game
 """
+from array import array
+import random
+import numpy as np
 from games.game import Game
 
 
@@ -34,43 +37,135 @@ class Layout(object):
         'xxxxxxxxxxxx'
     )
 
+    # Compiled layouts by source string, copied for every new game
+    _templates = {}
+
     def __init__(self, tiles):
-        self.tiles = tiles[:]
+        """
+        Compile rows of tiles into a flat grid, short rows are padded with
+        walls
+        """
+        self.height = len(tiles)
+        self.width = max(len(row) for row in tiles) if tiles else 0
+        self.cells = bytearray()
+        for row in tiles:
+            row = ''.join(row).ljust(self.width, self.WALL)
+            self.cells.extend(row.encode('ascii'))
+        # Walls never change, so copies share this mask
+        table = bytearray(256)
+        table[ord(self.WALL)] = 1
+        self.walls = self.cells.translate(bytes(table))
+        # Hash of the cells as compiled, games from copies update it as
+        # cells change instead of rehashing the grid
+        self.cells_hash = hash(bytes(self.cells))
         self.start = self.find_start()
         self.goal = self.find_goal()
 
-    @staticmethod
-    def from_string(chars):
+    @classmethod
+    def from_string(cls, chars):
         """
         Create layout from ASCII
         """
-        tiles = [[]]
-        for char in chars:
-            if char == '\n':
-                tiles.append([])
-            else:
-                tiles[-1].append(char)
-        return Layout(tiles)
+        template = cls._templates.get(chars)
+        if template is None:
+            template = cls(chars.split('\n'))
+            cls._templates[chars] = template
+        return template.copy()
+
+    @classmethod
+    def generate(cls, width, height, seed=None):
+        """
+        Random maze with the path from start (bottom left) to goal (top
+        right) marked as the solution. Sizes are rounded down to odd
+        numbers so passages sit between walls.
+        """
+        width -= 1 - width % 2
+        height -= 1 - height % 2
+        if width < 3 or height < 3 or width + height < 10:
+            raise ValueError('Maze is too small')
+        rng = random.Random(seed)
+        wall = ord(cls.WALL)
+        empty = ord(cls.EMPTY)
+        cells = bytearray(cls.WALL.encode('ascii')) * (width * height)
+        start = (height - 2) * width + 1
+        goal = 2 * width - 2
+        steps = ((2, 0), (-2, 0), (0, 2), (0, -2))
+
+        # Iterative depth first carving, the stack is the path back to start
+        cells[start] = empty
+        stack = [start]
+        path = None
+        while stack:
+            current = stack[-1]
+            if current == goal and path is None:
+                path = stack[:]
+            x, y = current % width, current // width
+            options = [
+                current + dy * width + dx
+                for dx, dy in steps
+                if 0 < x + dx < width - 1 and 0 < y + dy < height - 1 and
+                cells[current + dy * width + dx] == wall
+            ]
+            if not options:
+                stack.pop()
+                continue
+            step = rng.choice(options)
+            cells[(current + step) // 2] = empty
+            cells[step] = empty
+            stack.append(step)
+
+        solution = ord(cls.SOLUTION)
+        for current, step in zip(path, path[1:]):
+            cells[(current + step) // 2] = solution
+            cells[step] = solution
+        cells[start] = ord(cls.START)
+        cells[goal] = ord(cls.GOAL)
+        return cls([
+            cells[offset:offset + width].decode('ascii')
+            for offset in range(0, len(cells), width)
+        ])
+
+    def copy(self):
+        """
+        Create an independent layout, only the mutable cells are copied
+        """
+        layout = self.__class__.__new__(self.__class__)
+        layout.__dict__.update(self.__dict__)
+        layout.cells = self.cells[:]
+        return layout
+
+    def rows(self):
+        """
+        The layout as a list of strings
+        """
+        width = self.width
+        return [
+            self.cells[offset:offset + width].decode('ascii')
+            for offset in range(0, len(self.cells), width)
+        ]
 
     def render(self, renderer):
         """
         Draw the layout
         """
-        renderer.draw_text_array(self.tiles)
+        renderer.draw_text_array(self.rows())
+
+    def index(self, x, y):
+        """
+        Offset of x, y into cells, None if out of bounds
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return None
 
     def _find_target(self, target):
         """
         Find a specific tile
         """
-        y = 0
-        for row in self.tiles:
-            x = 0
-            for tile in row:
-                if tile == target:
-                    return x, y
-                x += 1
-            y += 1
-        return None
+        idx = self.cells.find(target.encode('ascii'))
+        if idx < 0:
+            return None
+        return idx % self.width, idx // self.width
 
     def find_start(self):
         """
@@ -88,11 +183,10 @@ class Layout(object):
         """
         Retrieve the tile at x, y
         """
-        ret = self.WALL
-        if y < len(self.tiles):
-            if x < len(self.tiles[y]):
-                ret = self.tiles[y][x]
-        return ret
+        idx = self.index(x, y)
+        if idx is None:
+            return self.WALL
+        return chr(self.cells[idx])
 
     def erase(self, x, y):
         """
@@ -104,7 +198,7 @@ class Layout(object):
         """
         Place a token in the layout
         """
-        self.tiles[y][x] = token
+        self.cells[self.index(x, y)] = ord(token)
 
 
 class Maze(Game):
@@ -113,12 +207,29 @@ class Maze(Game):
     """
     PLAYER_TOKEN = '*'
     WIN_TOKEN = '!'
+    # Byte values of the tokens for the cells fast path
+    _PLAYER = ord(PLAYER_TOKEN)
+    _WIN = ord(WIN_TOKEN)
+    _EMPTY = ord(Layout.EMPTY)
+    _SOLUTION = ord(Layout.SOLUTION)
+    _GOAL = ord(Layout.GOAL)
+    # Layout of the observe() vector
+    FEATURES = (
+        'wall_north', 'wall_south', 'wall_east', 'wall_west',
+        'goal_dx', 'goal_dy', 'goal_distance', 'score',
+    )
 
     def __init__(self, layout):
         self.layout = layout
         self.score = 0
         self.playing = True
         self.pos = layout.start
+        self._idx = layout.index(*self.pos)
+        # pos is part of the state key, so the hash treats the player's
+        # cell as empty and only changes when a move clears a token
+        self._cells_hash = layout.cells_hash ^ hash(
+            (self._idx, layout.cells[self._idx])) ^ hash(
+            (self._idx, self._EMPTY))
         self.layout.put_token(self.PLAYER_TOKEN, *self.pos)
         self.game_controls = {
             'W': self.north,
@@ -132,12 +243,14 @@ class Maze(Game):
         self.controls = self.game_controls.copy()
         self.controls.update(self.meta_controls)
         self.win = False
+        self.features = array('i', [0] * len(self.FEATURES))
+        self._observe()
 
     def in_progress(self):
         return self.playing
 
     def player_controls(self):
-        return self.game_controls.keys()
+        return list(self.game_controls)
 
     def render_state(self, renderer):
         self.layout.render(renderer)
@@ -149,6 +262,46 @@ class Maze(Game):
     def won(self):
         return self.win
 
+    def observe(self):
+        return self.features
+
+    def _observe(self):
+        """
+        Refresh the feature vector around the current position, O(1)
+        """
+        x, y = self.pos
+        features = self.features
+        features[0] = self._is_wall(x, y - 1)
+        features[1] = self._is_wall(x, y + 1)
+        features[2] = self._is_wall(x + 1, y)
+        features[3] = self._is_wall(x - 1, y)
+        if self.layout.goal is not None:
+            features[4] = self.layout.goal[0] - x
+            features[5] = self.layout.goal[1] - y
+            features[6] = abs(features[4]) + abs(features[5])
+        features[7] = self.score
+
+    def _is_wall(self, x, y):
+        idx = self.layout.index(x, y)
+        return idx is None or self.layout.walls[idx]
+
+    def state_key(self):
+        return (
+            self.pos, self.score, self.playing, self.win, self._cells_hash)
+
+    def snapshot(self):
+        return (
+            bytes(self.layout.cells), self.pos, self.score, self.playing,
+            self.win, self._cells_hash
+        )
+
+    def restore(self, state):
+        (cells, self.pos, self.score, self.playing, self.win,
+         self._cells_hash) = state
+        self.layout.cells = bytearray(cells)
+        self._idx = self.layout.index(*self.pos)
+        self._observe()
+
     def bad_move(self):
         """
         Bad move handler
@@ -175,17 +328,119 @@ class Maze(Game):
         self.playing = False
 
     def _move(self, dx, dy):
+        layout = self.layout
         new_pos = self.pos[0] + dx, self.pos[1] + dy
-        dst_token = self.layout.get_token(*new_pos)
-        if dst_token != self.layout.WALL:
-            old_pos = self.pos
-            self.layout.erase(*old_pos)
-            self.layout.put_token(self.PLAYER_TOKEN, *new_pos)
-            self.pos = new_pos
-            if dst_token == self.layout.SOLUTION:
-                self.score += 1
-            elif dst_token == self.layout.GOAL:
-                self.score += 1
-                self.layout.put_token(self.WIN_TOKEN, *new_pos)
-                self.win = True
-                self.quit()
+        idx = layout.index(*new_pos)
+        if idx is None or layout.walls[idx]:
+            return
+        cells = layout.cells
+        dst_token = cells[idx]
+        cells[self._idx] = self._EMPTY
+        cells[idx] = self._PLAYER
+        self.pos = new_pos
+        self._idx = idx
+        if dst_token == self._SOLUTION:
+            self.score += 1
+        elif dst_token == self._GOAL:
+            self.score += 1
+            cells[idx] = self._WIN
+            self.win = True
+            self.quit()
+        if dst_token != self._EMPTY:
+            left = cells[idx]
+            if left == self._PLAYER:
+                left = self._EMPTY
+            self._cells_hash ^= hash((idx, dst_token)) ^ hash((idx, left))
+        self._observe()
+
+
+class BatchMaze(object):
+    """
+    Many Maze games on one shared layout, stepped in lockstep with numpy
+    """
+    # Move codes, anything else is a bad move (no-op)
+    NOOP = 0
+    QUIT = 5
+    CODES = {'W': 1, 'A': 2, 'S': 3, 'D': 4, 'Q': QUIT}
+    DX = np.array([0, 0, -1, 0, 1, 0])
+    DY = np.array([0, -1, 0, 1, 0, 0])
+
+    def __init__(self, layout, count):
+        self.layout = layout
+        self.count = count
+        tiles = np.frombuffer(bytes(layout.cells), dtype=np.uint8)
+        self.walls = np.frombuffer(bytes(layout.walls), dtype=np.uint8) != 0
+        self.goal = tiles == ord(Layout.GOAL)
+        # Solution tiles get compact ids so each game only tracks those,
+        # the extra last id stands for every other tile
+        solution = tiles == ord(Layout.SOLUTION)
+        self.other_id = solution.sum()
+        self.solution_ids = np.full(len(tiles), self.other_id, np.intp)
+        self.solution_ids[solution] = np.arange(self.other_id)
+        self.x = np.full(count, layout.start[0], np.intp)
+        self.y = np.full(count, layout.start[1], np.intp)
+        self.score = np.zeros(count, np.intp)
+        self.playing = np.ones(count, bool)
+        self.win = np.zeros(count, bool)
+        # One bit per solution id and game, a 65k tile solution path takes
+        # 8 KB per game
+        self.visited = np.zeros((count, self.other_id // 8 + 1), np.uint8)
+
+    @classmethod
+    def encode(cls, plans, turns):
+        """
+        Pack move sequences into a (len(plans), turns) array of move codes,
+        finished plans are padded with quits
+        """
+        codes = np.full((len(plans), turns), cls.QUIT, np.intp)
+        for row, plan in zip(codes, plans):
+            moves = [cls.CODES.get(move, cls.NOOP) for move in plan[:turns]]
+            row[:len(moves)] = moves
+        return codes
+
+    def tick(self, moves):
+        """
+        Apply one move code per game
+        """
+        active = self.playing & (moves != self.NOOP)
+        self.playing &= moves != self.QUIT
+        nx = self.x + self.DX[moves]
+        ny = self.y + self.DY[moves]
+        width, height = self.layout.width, self.layout.height
+        inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+        idx = np.where(inside, ny * width + nx, 0)
+        moved = np.nonzero(
+            active & (moves != self.QUIT) & inside & ~self.walls[idx])[0]
+        idx = idx[moved]
+        self.x[moved] = nx[moved]
+        self.y[moved] = ny[moved]
+
+        solution_ids = self.solution_ids[idx]
+        # Each game moves at most once, so no (game, byte) pair repeats
+        byte = solution_ids >> 3
+        bit = np.left_shift(1, solution_ids & 7).astype(np.uint8)
+        seen = self.visited[moved, byte]
+        fresh = (seen & bit) == 0
+        self.visited[moved, byte] = seen | bit
+        fresh[solution_ids == self.other_id] = False
+        won = self.goal[idx]
+        self.score[moved] += fresh | won
+        self.win[moved[won]] = True
+        self.playing[moved[won]] = False
+
+    def play(self, plans, max_turns=None):
+        """
+        Play one plan per game, returns score, turns and win arrays that
+        match Session.play results
+        """
+        if max_turns is None:
+            max_turns = max(len(plan) for plan in plans) + 1
+        codes = self.encode(plans, max_turns)
+        turns = np.full(self.count, max_turns + 1, np.intp)
+        for turn in range(1, max_turns + 1):
+            playing = self.playing.copy()
+            self.tick(codes[:, turn - 1])
+            turns[playing & ~self.playing] = turn
+            if not self.playing.any():
+                break
+        return self.score, turns, self.win
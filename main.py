@@ -3,26 +3,50 @@
 Test harness
 """
 
+from argparse import ArgumentParser
 from time import time
-from games.maze import Maze, Layout
+from games.maze import BatchMaze, Maze, Layout
 from players import PlannedBot
 from trainer import BotTrainer
 
 
+def game_factory():
+    """
+    Creates the game we need (module level so worker processes can pickle it)
+    """
+    return Maze(Layout.from_string(Layout.MEDIUM_STR))
+
+
+def batch_factory(count):
+    """
+    Creates a batch of the game we need for a whole generation
+    """
+    return BatchMaze(Layout.from_string(Layout.MEDIUM_STR), count)
+
+
 def main():
     """
     Test harness
     """
-    def game_factory():
-        """
-        Creates the game we need
-        """
-        return Maze(Layout.from_string(Layout.MEDIUM_STR))
+    parser = ArgumentParser(description='Breed a bot that solves the maze')
+    parser.add_argument(
+        '--checkpoint', help='periodically save training state to this file')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='continue training from the checkpoint file')
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint:
+        parser.error('--resume requires --checkpoint')
 
     bot_factory = PlannedBot
-    trainer = BotTrainer(game_factory, bot_factory, 16, 2, goal_score=13)
+    trainer = BotTrainer(
+        game_factory, bot_factory, 16, 2, goal_score=13,
+        batch_factory=batch_factory, checkpoint_path=args.checkpoint)
+    checkpoint = None
+    if args.resume:
+        checkpoint = trainer.load_checkpoint(args.checkpoint)
     start_time = time()
-    generations, result = trainer.breed_best_bot()
+    generations, result = trainer.breed_best_bot(checkpoint)
     end_time = time()
 
     msg = 'After {} generations, the bot {} the game'.format(
@@ -1,4 +1,7 @@
-from neat.network import Network
+"""
+Neurons and networks wired up to games
+"""
+from neat.network import Network, Neuron
 
 
 class GameNeuron(Neuron):
@@ -6,7 +9,7 @@ class GameNeuron(Neuron):
     Neuron is 'activated' by something in the game state
     """
     def __init__(self, state_extractor):
-        super(GameStateNeuron, self).__init__()
+        super(GameNeuron, self).__init__()
         self.state_extractor = state_extractor
 
     def eval(self, hot, traversal):
@@ -16,13 +19,44 @@ class GameNeuron(Neuron):
             return self.State.NEUTRAL
 
 
+class FeatureNeuron(Neuron):
+    """
+    Neuron is 'activated' by a positive entry of the game's feature vector
+    """
+    def __init__(self, feature):
+        super(FeatureNeuron, self).__init__()
+        self.feature = feature
+
+    def eval(self, hot, traversal):
+        if traversal.game.observe()[self.feature] > 0:
+            return self.State.POSITIVE
+        else:
+            return self.State.NEUTRAL
+
 
 class GameNetwork(Network):
     """
     Add methods to evaluate game state on network
     """
-    def eval_game(game):
+    def __init__(
+            self, input_layer, output_layer, middle_layer=None,
+            connections=None, controls=None):
+        super(GameNetwork, self).__init__(
+            input_layer, output_layer, middle_layer, connections)
+        # Game control for each output neuron
+        self.controls = list(controls or [])
+
+    def genome_key(self):
+        return super(GameNetwork, self).genome_key() + (tuple(self.controls),)
+
+    def eval_game(self, game):
         """
-        Ask the network to evaluate this game
+        Ask the network to evaluate this game, returns the controls of
+        every positive output
         """
-        pass
+        traversal = self.traverse(game)
+        return [
+            control
+            for control, node in zip(self.controls, self.outputs)
+            if traversal[node] == Neuron.State.POSITIVE
+        ]
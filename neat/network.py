@@ -7,13 +7,14 @@ Original NEAT paper (that I didn't read):
     http://nn.cs.utexas.edu/downloads/papers/stanley.ec02.pdf
 """
 from __future__ import print_function
-from copy import deepcopy
+from array import array
 import random
 
 
 class Neuron(object):
     """
-    Base Network Node
+    Base Network Node, a node gene (shared between cloned networks so it
+    must not hold per-network state)
     """
     class State(object):
         """
@@ -23,14 +24,12 @@ class Neuron(object):
         POSITIVE = 1
         NEGATIVE = 2
 
-        def resolve(self, other):
+        @staticmethod
+        def resolve(state, other):
             """
             Resolve compound state
             """
-            return max(self, other)
-
-    def __init__(self):
-        self.outputs = {}
+            return max(state, other)
 
     def eval(self, hot, traversal):
         """
@@ -38,94 +37,240 @@ class Neuron(object):
         """
         return hot
 
-    def simulate(self, hot, traversal):
+
+class Traversal(dict):
+    """
+    Neuron states from one pass over a network
+    """
+    def __init__(self, game=None):
+        super(Traversal, self).__init__()
+        self.game = game
+
+
+class CompiledNetwork(object):
+    """
+    Topologically sorted, index based form of a network, each neuron is
+    evaluated once per pass
+    """
+    def __init__(self, network):
+        incoming = [[] for _ in network.nodes]
+        for source, target, polarity in network.connections:
+            incoming[target].append((source, polarity))
+
+        order = self._sort(network)
+        position = dict((idx, pos) for pos, idx in enumerate(order))
+        self.nodes = [network.nodes[idx] for idx in order]
+        self.inputs = array('b', [
+            idx < network.num_inputs for idx in order])
+        # Incoming edges of node i are in_sources/in_polarities
+        # [in_offsets[i]:in_offsets[i + 1]]
+        self.in_offsets = array('i', [0])
+        self.in_sources = array('i')
+        self.in_polarities = array('b')
+        for idx in order:
+            for source, polarity in incoming[idx]:
+                self.in_sources.append(position[source])
+                self.in_polarities.append(polarity)
+            self.in_offsets.append(len(self.in_sources))
+
+    @staticmethod
+    def _sort(network):
         """
-        Evaluate and propagate state
+        Kahn's algorithm, raises ValueError if the network has a cycle
         """
-        hot = self.eval(hot, traversal)
-        traversal[self] = traversal.get(self, self.State.NEUTRAL) or hot
-        for neuron, polarity in self.outputs.iteritems():
-            neuron.simulate(polarity.resolve(hot), traversal)
+        outgoing = [[] for _ in network.nodes]
+        pending = [0] * len(network.nodes)
+        for source, target, _ in network.connections:
+            outgoing[source].append(target)
+            pending[target] += 1
+        ready = [idx for idx in range(len(pending)) if not pending[idx]]
+        ready.reverse()
+        order = []
+        while ready:
+            idx = ready.pop()
+            order.append(idx)
+            for target in outgoing[idx]:
+                pending[target] -= 1
+                if not pending[target]:
+                    ready.append(target)
+        if len(order) != len(pending):
+            raise ValueError('Network contains a cycle')
+        return order
 
-    def print(self, **kwargs):
+    def evaluate(self, traversal):
         """
-        Print node info
+        Evaluate every neuron once, in topological order
         """
-        output_hashes = [
-            (polarity, hash(node))
-            for polarity, node in self.outputs.iteritems()
-        ]
-        print(hash(self), '->', *output_hashes, **kwargs)
+        neutral = Neuron.State.NEUTRAL
+        states = [neutral] * len(self.nodes)
+        offsets = self.in_offsets
+        sources = self.in_sources
+        polarities = self.in_polarities
+        for idx, node in enumerate(self.nodes):
+            if self.inputs[idx]:
+                hot = Neuron.State.POSITIVE
+            else:
+                hot = neutral
+                for edge in range(offsets[idx], offsets[idx + 1]):
+                    state = states[sources[edge]]
+                    if state != neutral:
+                        hot = max(hot, polarities[edge], state)
+            states[idx] = node.eval(hot, traversal)
+            traversal[node] = states[idx]
+        return traversal
 
 
 class Network(object):
     """
-    Neural Network
+    Neural Network stored as a genome: node genes ordered inputs, outputs,
+    then middle, and (source id, target id, polarity) connection genes
     """
-    def __init__(self, input_layer, output_layer, middle_layer=None):
-        self.inputs = deepcopy(input_layer)
-        self.outputs = deepcopy(output_layer)
-        self.middle = deepcopy(middle_layer) if middle_layer else []
+    def __init__(
+            self, input_layer, output_layer, middle_layer=None,
+            connections=None):
+        self.nodes = list(input_layer) + list(output_layer)
+        self.nodes += middle_layer or []
+        self.num_inputs = len(input_layer)
+        self.num_outputs = len(output_layer)
+        self.connections = list(connections or [])
+        self._compiled = None
+
+    @property
+    def inputs(self):
+        """
+        Input layer neurons
+        """
+        return self.nodes[:self.num_inputs]
+
+    @property
+    def outputs(self):
+        """
+        Output layer neurons
+        """
+        return self.nodes[self.num_inputs:self.num_inputs + self.num_outputs]
+
+    @property
+    def middle(self):
+        """
+        Hidden neurons
+        """
+        return self.nodes[self.num_inputs + self.num_outputs:]
 
     def deep_copy(self):
         """
-        Create a copy of the network
+        Create a copy of the network, genes are shared with the original
+        and only the gene lists are copied
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.nodes = self.nodes[:]
+        clone.connections = self.connections[:]
+        # Still valid until either network mutates
+        clone._compiled = self._compiled
+        return clone
+
+    def genome_key(self):
+        """
+        Hashable form of the genome, equal for networks that evaluate alike:
+        the (shared) input and output genes, hidden neuron types and the
+        connection genes in any order
+        """
+        middle = self.num_inputs + self.num_outputs
+        return (
+            tuple(self.nodes[:middle]),
+            tuple(type(node) for node in self.nodes[middle:]),
+            tuple(sorted(self.connections)),
+        )
+
+    def compile(self):
+        """
+        Compiled form of the network, reused until the next mutation
         """
-        return self.__class__(self.inputs, self.outputs, self.middle)
+        if self._compiled is None:
+            self._compiled = CompiledNetwork(self)
+        return self._compiled
 
-    def traverse(self):
+    def traverse(self, game=None):
         """
         Evaluate network
         """
-        traversal = {}
-        for node in self.inputs:
-            node.simulate(node.State.POSITIVE, traversal)
-        return traversal
+        return self.compile().evaluate(Traversal(game))
 
-    def add_random_neuron(self, allow_middle=True, factory=Neuron):
+    def add_random_neuron(self, allow_middle=True, factory=Neuron, rng=random):
         """
         Mutate network with a new neuron
         """
-        edge = self._create_canidate_edge(allow_middle)
+        edge = self._create_canidate_edge(allow_middle, rng)
         new_input, input_polarity, new_output, output_polarity = edge
 
-        node = factory()
-        node.outputs[new_output] = output_polarity
-        new_input.outputs[node] = input_polarity
-        self.middle.append(new_input)
+        node = len(self.nodes)
+        self.nodes.append(factory())
+        self.connections.append((new_input, node, input_polarity))
+        self.connections.append((node, new_output, output_polarity))
+        self._compiled = None
 
-    def add_random_connection(self):
+    def add_random_connection(self, rng=random):
         """
         Mutate network with a new connection
         """
-        edge = self._create_canidate_edge()
+        edge = self._create_canidate_edge(rng=rng)
         new_input, input_polarity, new_output, _ = edge
 
-        new_input.outputs[new_output] = input_polarity
+        self.connections = [
+            gene for gene in self.connections
+            if gene[:2] != (new_input, new_output)
+        ]
+        self.connections.append((new_input, new_output, input_polarity))
+        self._compiled = None
 
-    def _create_canidate_edge(self, allow_middle=True):
+    def _create_canidate_edge(self, allow_middle=True, rng=random):
+        """
+        Pick a random edge that keeps the network acyclic (edges out of
+        input neurons always do, so this terminates)
+        """
         possible_states = (Neuron.State.POSITIVE, Neuron.State.NEGATIVE)
-        input_polarity = random.choice(possible_states)
-        output_polarity = random.choice(possible_states)
-
-        input_choices = self.inputs
+        middle = range(self.num_inputs + self.num_outputs, len(self.nodes))
+        input_choices = list(range(self.num_inputs))
+        output_choices = list(range(
+            self.num_inputs, self.num_inputs + self.num_outputs))
         if allow_middle:
-            input_choices += self.middle
-        new_input = random.choice(input_choices)
+            input_choices += middle
+            output_choices += middle
+        while True:
+            input_polarity = rng.choice(possible_states)
+            output_polarity = rng.choice(possible_states)
+            new_input = rng.choice(input_choices)
+            new_output = rng.choice(
+                [_ for _ in output_choices if _ != new_input])
+            if not self._reaches(new_output, new_input):
+                return new_input, input_polarity, new_output, output_polarity
 
-        output_choices = self.outputs
-        if allow_middle:
-            output_choices += self.middle
-        output_choices = [_ for _ in output_choices if _ != new_input]
-        new_output = random.choice(output_choices)
-
-        return new_input, input_polarity, new_output, output_polarity
+    def _reaches(self, source, target):
+        """
+        Whether a path of connections leads from source to target
+        """
+        outgoing = {}
+        for gene_source, gene_target, _ in self.connections:
+            outgoing.setdefault(gene_source, []).append(gene_target)
+        seen = set([source])
+        pending = [source]
+        while pending:
+            node = pending.pop()
+            if node == target:
+                return True
+            for next_node in outgoing.get(node, ()):
+                if next_node not in seen:
+                    seen.add(next_node)
+                    pending.append(next_node)
+        return False
 
     def print(self):
         """
         Print network info
         """
-        for layer in [self.inputs, self.middle, self.outputs]:
-            for node in layer:
-                node.print(end=', ')
-            print('')
+        for idx, node in enumerate(self.nodes):
+            print(idx, type(node).__name__, end=', ')
+        print('')
+        for source, target, polarity in self.connections:
+            print(source, '->', target, polarity, end=', ')
+        print('')
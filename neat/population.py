@@ -0,0 +1,84 @@
+"""
+Evaluate a whole population of NEAT networks at once with numpy
+"""
+import numpy as np
+from neat.network import Neuron, Traversal
+
+
+class PopulationEvaluator(object):
+    """
+    Packs many networks into padded polarity matrices so every network's
+    outputs come from a few array operations.
+    Only input neurons may override Neuron.eval, the rest must pass their
+    state through unchanged.
+    """
+    def __init__(self, networks):
+        self.networks = networks
+        count = len(networks)
+        # The extra last node is never connected and pads short layers
+        size = max(len(network.nodes) for network in networks) + 1
+        self.num_inputs = max(network.num_inputs for network in networks)
+        num_outputs = max(network.num_outputs for network in networks)
+
+        self.polarity = np.zeros((count, size, size), np.int8)
+        self.is_input = np.zeros((count, size), bool)
+        self.output_ids = np.full((count, num_outputs), size - 1, np.intp)
+        self.depth = 0
+        for row, network in enumerate(networks):
+            for source, target, polarity in network.connections:
+                self.polarity[row, source, target] = polarity
+            self.is_input[row, :network.num_inputs] = True
+            self.output_ids[row, :network.num_outputs] = np.arange(
+                network.num_inputs, network.num_inputs + network.num_outputs)
+            self.depth = max(self.depth, self._depth(network))
+
+    @staticmethod
+    def _depth(network):
+        """
+        Longest path through the network, the number of steps it takes for
+        inputs to reach every neuron
+        """
+        depth = [0] * len(network.nodes)
+        compiled = network.compile()
+        ids = dict((node, idx) for idx, node in enumerate(network.nodes))
+        targets = [[] for _ in network.nodes]
+        for source, target, _ in network.connections:
+            targets[source].append(target)
+        for node in compiled.nodes:
+            source = ids[node]
+            for target in targets[source]:
+                depth[target] = max(depth[target], depth[source] + 1)
+        return max(depth) if depth else 0
+
+    def input_states(self, games):
+        """
+        Evaluate every network's input neurons against its own game,
+        returns a (networks, inputs) array
+        """
+        states = np.zeros((len(self.networks), self.num_inputs), np.int8)
+        for row, (network, game) in enumerate(zip(self.networks, games)):
+            traversal = Traversal(game)
+            states[row, :network.num_inputs] = [
+                node.eval(Neuron.State.POSITIVE, traversal)
+                for node in network.inputs
+            ]
+        return states
+
+    def evaluate(self, input_states):
+        """
+        Output neuron states for input states shaped (..., networks,
+        inputs), leading dimensions are a batch of game states
+        """
+        input_states = np.asarray(input_states, np.int8)
+        shape = input_states.shape[:-1] + self.is_input.shape[-1:]
+        states = np.zeros(shape, np.int8)
+        states[..., :self.num_inputs] = input_states
+        polarity = self.polarity
+        connected = polarity > 0
+        for _ in range(self.depth):
+            sources = states[..., :, :, np.newaxis]
+            signal = np.where(
+                connected & (sources > 0), np.maximum(polarity, sources), 0)
+            states = np.where(self.is_input, states, signal.max(axis=-2))
+        rows = np.arange(len(self.networks))[:, np.newaxis]
+        return states[..., rows, self.output_ids]
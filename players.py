@@ -9,9 +9,12 @@ class Player(object):
     """
     Base player object
     """
-    def next_move(self, game):
+    __slots__ = ()
+
+    def next_move(self, game, cursor):
         """
-        Retrieve the next move for this player in this game
+        Retrieve the next move for this player in this game, cursor
+        (Session.Cursor) tracks the player's place in it
         """
         raise NotImplementedError
 
@@ -20,7 +23,7 @@ class HumanPlayer(Player):
     """
     Human player input
     """
-    def next_move(self, game):
+    def next_move(self, game, cursor):
         return readchar().upper()
 
 
@@ -28,65 +31,231 @@ class BotPlayer(Player):
     """
     Base bot player
     """
-    def reproduce(self, allowed_moves, min_mutations, max_mutations):
+    __slots__ = ()
+
+    # Mutations that created this bot from its parent
+    mutations = 0
+
+    def reproduce(
+            self, allowed_moves, min_mutations, max_mutations, rng=random):
         """
-        Create a new bot based on this bot
+        Create a new bot based on this bot, drawing mutations from rng (a
+        random.Random, the global random module by default)
         """
         raise NotImplementedError
 
+    def genome_key(self):
+        """
+        Hashable key shared by bots that would play identically, None if
+        unknown (the bot is then always tested)
+        """
+        return None
+
+
+def _unpack_table(moves):
+    """
+    The four moves packed in each byte value
+    """
+    return [
+        ''.join(moves[(byte >> shift) & 3] for shift in (0, 2, 4, 6))
+        for byte in range(256)
+    ]
+
+
+class Plan(object):
+    """
+    Immutable move sequence packed 2 bits per move, four moves per byte.
+    Hashable, and slices come back as plain strings of moves.
+    """
+    # data is a bytearray for fast indexing, it never changes once built
+    __slots__ = ('data', 'length')
+
+    MOVES = 'WASD'
+    CODES = dict((move, code) for code, move in enumerate(MOVES))
+    # Every byte value to its four moves and back
+    _UNPACK = _unpack_table(MOVES)
+    _PACK = dict((moves, byte) for byte, moves in enumerate(_UNPACK))
+
+    def __init__(self, moves=''):
+        self.data = bytearray()
+        self.length = 0
+        if moves:
+            self.data, self.length = self._extend(moves)
+
+    def _extend(self, moves):
+        """
+        Packed data and length of this plan followed by moves
+        """
+        moves = ''.join(moves)
+        length = self.length + len(moves)
+        data = bytearray(self.data)
+        used = self.length & 3
+        try:
+            if used:
+                for shift, move in enumerate(moves[:4 - used], used):
+                    data[-1] |= self.CODES[move] << 2 * shift
+                moves = moves[4 - used:]
+            full = len(moves) & ~3
+            data.extend(
+                self._PACK[moves[i:i + 4]] for i in range(0, full, 4))
+            if full < len(moves):
+                # Padding with the zero move leaves the spare bits clear
+                data.append(
+                    self._PACK[moves[full:].ljust(4, self.MOVES[0])])
+        except KeyError:
+            raise ValueError('Plans only hold the moves ' + self.MOVES)
+        return data, length
+
+    def __add__(self, moves):
+        """
+        New plan with moves (a string, list or Plan) appended
+        """
+        plan = Plan.__new__(Plan)
+        plan.data, plan.length = self._extend(moves)
+        return plan
+
+    def __str__(self):
+        unpack = self._UNPACK
+        moves = ''.join([unpack[byte] for byte in self.data])
+        return moves[:self.length]
+
+    def __repr__(self):
+        return 'Plan({!r})'.format(str(self))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return str(self)[idx]
+        if idx < 0:
+            idx += self.length
+        if not 0 <= idx < self.length:
+            raise IndexError('Plan index out of range')
+        return self._UNPACK[self.data[idx >> 2]][idx & 3]
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Plan) and
+            self.length == other.length and self.data == other.data
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.length, bytes(self.data)))
+
+    def __getstate__(self):
+        return self.data, self.length
+
+    def __setstate__(self, state):
+        self.data, self.length = state
+
 
 class PlannedBot(BotPlayer):
     """
-    Bot is "born" with a fixed set of moves
+    Bot is "born" with a fixed set of moves, plans hold the moves in
+    Plan.MOVES only
     """
+    __slots__ = ('moves', 'mutations')
+
     def __init__(self, moves=None):
-        self.moves = moves or []
-        self.games = {}
-
-    def next_move(self, game):
-        idx = self.games.get(game, 0)
-        self.games[game] = idx + 1
-        if idx < len(self.moves):
-            return self.moves[idx]
+        if not isinstance(moves, Plan):
+            moves = Plan(moves or '')
+        self.moves = moves
+        self.mutations = 0
+
+    def __getstate__(self):
+        return self.moves, self.mutations
+
+    def __setstate__(self, state):
+        self.moves, self.mutations = state
+
+    def next_move(self, game, cursor):
+        moves = cursor.data
+        if moves is None:
+            # Unpacked once per session, indexing a string is much faster
+            moves = cursor.data = str(self.moves)
+        idx = cursor.turn
+        cursor.turn = idx + 1
+        if idx < len(moves):
+            return moves[idx]
         # HACK
         return 'Q'
 
-    def reproduce(self, allowed_moves, min_mutations, max_mutations):
+    def genome_key(self):
+        return self.moves
+
+    def remaining_moves(self, cursor):
+        """
+        The part of the plan this bot has yet to play in a session
+        """
+        moves = cursor.data
+        if moves is None:
+            moves = cursor.data = str(self.moves)
+        return moves[cursor.turn:]
+
+    def reproduce(
+            self, allowed_moves, min_mutations, max_mutations, rng=random):
         """
         Create a new bot based on this bot
         """
-        mutations = random.randint(min_mutations, max_mutations)
-        new_moves = self.moves[:]
-        for _ in xrange(mutations):
-            new_moves.append(random.choice(allowed_moves))
-        return self.__class__(new_moves)
+        if not set(allowed_moves) <= set(Plan.MOVES):
+            raise ValueError(
+                'PlannedBot plays only {}, not {}'.format(
+                    Plan.MOVES, ''.join(sorted(allowed_moves))))
+        mutations = rng.randint(min_mutations, max_mutations)
+        new_moves = ''.join(
+            [rng.choice(allowed_moves) for _ in range(mutations)])
+        child = self.__class__(self.moves + new_moves)
+        child.mutations = mutations
+        return child
 
 
 class NeatBot(BotPlayer):
-    network_factory = GameNetwork()
-    def __init__(self, network):
-        self.games = {}
-        self.network = network or self.network_factory()
+    """
+    Bot moves as its network decides, subclasses provide network_factory
+    (a GameNetwork sized for their game) for bots built without one
+    """
+    network_factory = None
+
+    def __init__(self, network=None):
+        if network is None:
+            if self.network_factory is None:
+                raise TypeError(
+                    '{} needs a network or a network_factory'.format(
+                        type(self).__name__))
+            network = self.network_factory()
+        self.network = network
 
-    def next_move(self, game):
+    def next_move(self, game, cursor):
         moves = self.network.eval_game(game)
-        # HACK
-        preference = 'wasd'
-        for move in preference:
+        # Ties go to the control the game lists first
+        for move in game.player_controls():
             if move in moves:
                 return move
 
         # HACK
         return 'Q'
 
-    def reproduce(self, allowed_moves, min_mutations, max_mutations):
-        mutations = random.randint(min_mutations, max_mutations)
+    def genome_key(self):
+        return self.network.genome_key()
+
+    def reproduce(
+            self, allowed_moves, min_mutations, max_mutations, rng=random):
+        mutations = rng.randint(min_mutations, max_mutations)
         new_network = self.network.deep_copy()
         mutators = [    # FIXME: Add weights
             new_network.add_random_neuron,
             new_network.add_random_connection
         ]
-        for _ in xrange(mutations):
-            mutator = random.choice(mutators)
-            mutator()
-        return self.__class__(new_network)
+        for _ in range(mutations):
+            mutator = rng.choice(mutators)
+            mutator(rng=rng)
+        child = self.__class__(new_network)
+        child.mutations = mutations
+        return child
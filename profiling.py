@@ -0,0 +1,172 @@
+"""
+Low overhead instrumentation for training runs
+"""
+from cProfile import Profile
+from collections import defaultdict
+from timeit import default_timer
+import json
+from renderers import RenderContext
+
+
+class NullProfiler(object):
+    """
+    Dummy profiler, instrumentation is off
+    """
+    class NullStage(object):
+        """
+        Reusable do-nothing context manager
+        """
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+    _null_stage = NullStage()
+
+    def stage(self, name):
+        """
+        Dummy method for compatibility
+        """
+        return self._null_stage
+
+    def count(self, name, amount=1):
+        """
+        Dummy method for compatibility
+        """
+        pass
+
+    def timed(self, name, func):
+        """
+        Dummy method for compatibility
+        """
+        return func
+
+    def render_context(self, render_context):
+        """
+        Dummy method for compatibility
+        """
+        return render_context
+
+    def start_generation(self, generation):
+        """
+        Dummy method for compatibility
+        """
+        pass
+
+    def finish(self):
+        """
+        Dummy method for compatibility
+        """
+        pass
+
+
+class Profiler(NullProfiler):
+    """
+    Cumulative per stage timings and counters, written as one JSON line per
+    generation to output. Stages may nest (e.g. play includes render).
+    Generations in profile_generations (a range) also run under cProfile,
+    the stats are saved to profile_path.
+    """
+    class Stage(object):
+        """
+        Times one stage into the profiler
+        """
+        def __init__(self, profiler, name):
+            self.profiler = profiler
+            self.name = name
+            self.start = None
+
+        def __enter__(self):
+            self.start = default_timer()
+            return self
+
+        def __exit__(self, *exc_info):
+            elapsed = default_timer() - self.start
+            self.profiler.stages[self.name] += elapsed
+            return False
+
+    class TimedRenderContext(RenderContext):
+        """
+        Render context proxy that times drawing as the render stage
+        """
+        def __init__(self, profiler, render_context):
+            self.profiler = profiler
+            self.render_context = render_context
+
+        def reset_frame(self):
+            with self.profiler.stage('render'):
+                self.render_context.reset_frame()
+
+        def draw_text_array(self, arr):
+            with self.profiler.stage('render'):
+                self.render_context.draw_text_array(arr)
+
+        def end_frame(self):
+            with self.profiler.stage('render'):
+                self.render_context.end_frame()
+
+    def __init__(self, output, profile_generations=(), profile_path=None):
+        self.output = output
+        self.profile_generations = profile_generations
+        self.profile_path = profile_path
+        self.profile = None
+        self.generation = None
+        self.generation_start = None
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+
+    def stage(self, name):
+        return self.Stage(self, name)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def timed(self, name, func):
+        def timed_func(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return timed_func
+
+    def render_context(self, render_context):
+        if render_context is None:
+            return None
+        return self.TimedRenderContext(self, render_context)
+
+    def start_generation(self, generation):
+        """
+        Finish the current generation (if any) and start timing the next
+        """
+        self._end_generation()
+        self.generation = generation
+        self.generation_start = default_timer()
+        if generation in self.profile_generations:
+            if self.profile is None:
+                self.profile = Profile()
+            self.profile.enable()
+
+    def finish(self):
+        """
+        Flush the last generation and any cProfile capture
+        """
+        self._end_generation()
+        if self.profile is not None and self.profile_path:
+            self.profile.dump_stats(self.profile_path)
+        self.profile = None
+
+    def _end_generation(self):
+        if self.generation is None:
+            return
+        if self.profile is not None:
+            self.profile.disable()
+        record = {
+            'generation': self.generation,
+            'elapsed': default_timer() - self.generation_start,
+            'stages': dict(self.stages),
+            'counters': dict(self.counters),
+        }
+        self.output.write(json.dumps(record, sort_keys=True) + '\n')
+        self.output.flush()
+        self.generation = None
+        self.stages.clear()
+        self.counters.clear()
@@ -3,6 +3,7 @@ Game Renderers
 """
 import sys
 from contextlib import contextmanager
+from time import time
 
 
 class BaseRenderer(object):
@@ -32,6 +33,12 @@ class RenderContext(object):
         """
         raise NotImplementedError
 
+    def end_frame(self):
+        """
+        The frame is complete, buffering contexts show it now
+        """
+        pass
+
 
 class PrintRenderer(BaseRenderer, RenderContext):
     """
@@ -78,29 +85,87 @@ class TerminalRenderer(BaseRenderer):
 
     class Renderer(RenderContext):
         """
-        Device Renderer
+        Device Renderer, frames are built in memory and only the cells that
+        changed since the last shown frame are written
         """
-        def __init__(self, output):
+        def __init__(self, output, max_fps=None):
             self.output = output
-            self.height = 0
+            self.frame = []
+            self.shown = []
+            self.min_interval = 1.0 / max_fps if max_fps else 0.0
+            self.last_shown = None
 
         def reset_frame(self):
-            # Terminal controls:
-            # \x1b[A - Move up
-            # \x1b[2K - Clear line
-            self.output.write('\x1b[2K\x1b[A' * self.height)
-            self.output.write('\x1b[2K\r')
-            self.output.flush()
-            self.height = 0
+            self.frame = []
 
         def draw_text_array(self, arr):
             """
             Draws an array of characters
             """
-            for row in arr:
-                self.output.write(''.join(row) + '\n')
-                self.height += 1
-            self.output.flush()
+            self.frame.extend(''.join(row) for row in arr)
+
+        def end_frame(self, force=False):
+            """
+            Show the frame unless that would exceed max_fps
+            """
+            now = time()
+            if (not force and self.last_shown is not None and
+                    now - self.last_shown < self.min_interval):
+                return
+            self.last_shown = now
+            if self.frame != self.shown:
+                self.output.write(self._diff(self.shown, self.frame))
+                self.output.flush()
+                self.shown = self.frame[:]
+
+        @staticmethod
+        def _diff(old, new):
+            """
+            Terminal output turning the old frame into the new one, the
+            cursor starts and ends on the line below the frame
+            """
+            # Terminal controls:
+            # \x1b[nA / \x1b[nB - Move up / down n lines
+            # \x1b[nC - Move right n columns
+            # \x1b[K - Clear to end of line
+            # \x1b[2K - Clear line
+            out = []
+            cursor = [len(old)]
+
+            def move_to(line):
+                if line < cursor[0]:
+                    out.append('\x1b[{}A'.format(cursor[0] - line))
+                elif line > cursor[0]:
+                    out.append('\x1b[{}B'.format(line - cursor[0]))
+                out.append('\r')
+                cursor[0] = line
+
+            for line, (old_row, new_row) in enumerate(zip(old, new)):
+                if old_row == new_row:
+                    continue
+                start = 0
+                while (start < len(old_row) and start < len(new_row) and
+                       old_row[start] == new_row[start]):
+                    start += 1
+                move_to(line)
+                if start:
+                    out.append('\x1b[{}C'.format(start))
+                out.append(new_row[start:])
+                if len(new_row) < len(old_row):
+                    out.append('\x1b[K')
+            if len(new) > len(old):
+                move_to(len(old))
+                out.extend(row + '\n' for row in new[len(old):])
+                cursor[0] = len(new)
+            else:
+                for line in range(len(new), len(old)):
+                    move_to(line)
+                    out.append('\x1b[2K')
+                move_to(len(new))
+            return ''.join(out)
+
+    def __init__(self, max_fps=30):
+        self.max_fps = max_fps
 
     @contextmanager
     def render_context(self):
@@ -112,8 +177,10 @@ class TerminalRenderer(BaseRenderer):
         sys.stdout = self.LockedFile()
         sys.stderr = self.LockedFile()
 
+        renderer = self.Renderer(stdout, self.max_fps)
         try:
-            yield self.Renderer(stdout)
+            yield renderer
+            renderer.end_frame(force=True)
         finally:
             sys.stderr = stderr
             sys.stdout = stdout
@@ -175,8 +242,4 @@ class StateExtractor(MemoryRenderer):
             """
             Extract entire game state
             """
-            state = ''
-            for row in self.data:
-                for elem in row:
-                    state += elem
-            return state
+            return ''.join(''.join(row) for row in self.data)
@@ -0,0 +1,61 @@
+"""
+Concurrent async sessions must pick the serial trainer's champion
+"""
+import random
+import unittest
+from time import time
+from games.game import Session
+from players import PlannedBot
+from renderers import NullRenderer
+from tests.test_equivalence import game_factory
+from trainer import BotTrainer
+try:
+    from aio import AsyncBotTrainer, DelayedPlayer
+except SyntaxError:
+    # Python 2
+    AsyncBotTrainer = None
+
+
+@unittest.skipIf(AsyncBotTrainer is None, 'asyncio needs Python 3')
+class AsyncBotTrainerTest(unittest.TestCase):
+    MAX_TURNS = 20
+    LATENCY = 0.005
+
+    def trainer(self, trainer_class=BotTrainer, **kwargs):
+        return trainer_class(
+            game_factory, PlannedBot, 20, 2, max_turns=self.MAX_TURNS,
+            progress_renderer_factory=NullRenderer, **kwargs)
+
+    def test_sessions_overlap_and_pick_the_serial_champion(self):
+        rng = random.Random(3)
+        parent = PlannedBot(['W', 'W', 'W', 'W', 'D', 'D'])
+        bots = [parent.reproduce('WASD', 1, 8, rng) for _ in range(20)]
+        serial = self.trainer().test_generation(
+            bots, Session.Result.zero(), None)
+        trainer = self.trainer(
+            AsyncBotTrainer,
+            bot_wrapper=lambda bot: DelayedPlayer(bot, self.LATENCY))
+        start = time()
+        result = trainer.test_generation(bots, Session.Result.zero(), None)
+        elapsed = time() - start
+        self.assertEqual(
+            (result.bot_id, result.score, result.turns, result.finished),
+            (serial.bot_id, serial.score, serial.turns, serial.finished))
+        # One after the other the sessions would wait this long
+        waits = sum(
+            min(Session(game_factory(), bot).play(self.MAX_TURNS).turns,
+                self.MAX_TURNS)
+            for bot in bots) * self.LATENCY
+        self.assertLess(elapsed, waits / 4)
+
+    def test_unsupported_options_are_rejected(self):
+        for kwargs in (
+                {'workers': 2},
+                {'prefix_cache_size': 8},
+                {'outcome_cache_size': 8}):
+            with self.assertRaises(ValueError):
+                self.trainer(AsyncBotTrainer, **kwargs)
+
+
+if __name__ == '__main__':
+    unittest.main()
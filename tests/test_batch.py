@@ -0,0 +1,40 @@
+"""
+BatchMaze must score every game exactly like a Maze session
+"""
+import random
+import unittest
+from games.game import Session
+from games.maze import BatchMaze, Layout, Maze
+from players import BotPlayer, PlannedBot
+from renderers import NullRenderer
+from tests.test_equivalence import batch_factory, game_factory
+from trainer import BotTrainer
+
+
+class BatchMazeTest(unittest.TestCase):
+    def test_matches_sessions(self):
+        # More than 8 solution tiles, so the visited bits span bytes
+        layout = Layout.generate(41, 41, seed=1)
+        rng = random.Random(0)
+        plans = [
+            [rng.choice('WASD') for _ in range(rng.randint(20, 300))]
+            for _ in range(100)
+        ]
+        scores, turns, wins = BatchMaze(layout, len(plans)).play(plans, 200)
+        for plan, score, turn, win in zip(plans, scores, turns, wins):
+            result = Session(Maze(layout.copy()), PlannedBot(plan)).play(200)
+            self.assertEqual(
+                (result.score, result.turns, result.finished),
+                (score, turn, win))
+
+    def test_bots_without_plans_are_rejected(self):
+        trainer = BotTrainer(
+            game_factory, PlannedBot, 1, 1, batch_factory=batch_factory,
+            progress_renderer_factory=NullRenderer)
+        with self.assertRaises(TypeError) as context:
+            trainer.test_generation([BotPlayer()], Session.Result.zero(), None)
+        self.assertIn('BotPlayer has none', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Seeded training runs must pick the same champion however the generations
+are evaluated
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from games.game import BoundPolicy, CyclePolicy, Session, StallPolicy
+from games.maze import BatchMaze, Layout, Maze
+from players import PlannedBot
+from renderers import NullRenderer
+from trainer import BotTrainer
+
+
+def game_factory():
+    """
+    Module level so worker processes can pickle it
+    """
+    return Maze(Layout.from_string(Layout.MEDIUM_STR))
+
+
+def batch_factory(count):
+    return BatchMaze(Layout.from_string(Layout.MEDIUM_STR), count)
+
+
+class EquivalenceTest(unittest.TestCase):
+    """
+    Every evaluation mode against a plain serial run without dedup
+    """
+    SEED = 7
+    POLICY_MODES = (
+        {},
+        {'genome_cache_size': 1000},
+        {'workers': 2},
+        {'prefix_cache_size': 8, 'outcome_cache_size': 1000},
+        {'workers': 2, 'prefix_cache_size': 8},
+    )
+
+    def setUp(self):
+        self.expected = self.breed(dedup=False)
+
+    def trainer(self, **kwargs):
+        kwargs.setdefault('seed', self.SEED)
+        return BotTrainer(
+            game_factory, PlannedBot, 50, 2, goal_score=13, max_turns=30,
+            progress_renderer_factory=NullRenderer, **kwargs)
+
+    def breed(self, checkpoint=None, **kwargs):
+        generations, result = self.trainer(**kwargs).breed_best_bot(
+            checkpoint)
+        return (
+            generations, result.score, result.turns, result.finished,
+            str(result.player.moves)
+        )
+
+    def test_winner_is_found(self):
+        self.assertTrue(self.expected[3])
+
+    def test_serial_dedup(self):
+        self.assertEqual(self.breed(), self.expected)
+
+    def test_genome_cache(self):
+        self.assertEqual(self.breed(genome_cache_size=1000), self.expected)
+
+    def test_worker_pool(self):
+        self.assertEqual(self.breed(workers=2), self.expected)
+
+    def test_batch(self):
+        self.assertEqual(
+            self.breed(batch_factory=batch_factory), self.expected)
+
+    def test_prefix_and_outcome_caches(self):
+        self.assertEqual(
+            self.breed(prefix_cache_size=8, outcome_cache_size=1000),
+            self.expected)
+
+    def test_stop_policies(self):
+        def policies():
+            return StallPolicy(3), CyclePolicy(), BoundPolicy()
+        expected = self.breed(dedup=False, stop_policies=policies())
+        for kwargs in self.POLICY_MODES:
+            self.assertEqual(
+                self.breed(stop_policies=policies(), **kwargs), expected)
+
+    def test_stop_policies_see_the_parent_moves(self):
+        # The child returns to a state only its parent's moves passed
+        parent = PlannedBot(list('WSW'))
+        child = PlannedBot(list('WSWWWDDDDDDDDDD'))
+
+        def generation(**kwargs):
+            trainer = self.trainer(stop_policies=(CyclePolicy(),), **kwargs)
+            with trainer.worker_pool():
+                result = trainer.test_generation(
+                    [child], Session.Result.zero(), None, parent)
+            return result.score, result.turns, result.finished
+
+        expected = generation(dedup=False)
+        for kwargs in self.POLICY_MODES:
+            self.assertEqual(generation(**kwargs), expected)
+
+    def test_checkpoint_resume(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'checkpoint')
+            partial = self.breed(
+                checkpoint_path=path, checkpoint_interval=1,
+                max_generations=2)
+            self.assertFalse(partial[3])
+            checkpoint = BotTrainer.load_checkpoint(path)
+            self.assertEqual(
+                self.breed(checkpoint, seed=self.SEED + 1), self.expected)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+The evaluation service must return each bot's own result, or fail loudly
+"""
+import unittest
+import evaluation
+from games.game import Session
+from games.maze import Layout, Maze
+from players import Plan, PlannedBot
+
+
+class EvaluationTest(unittest.TestCase):
+    def setUp(self):
+        self.broker = evaluation.start_broker(('127.0.0.1', 0))
+        self.address = self.broker.address
+
+    def tearDown(self):
+        self.broker.shutdown()
+
+    def evaluator(self, **kwargs):
+        return evaluation.RemoteEvaluator(
+            'medium', self.address, **kwargs)
+
+    def test_stray_results_are_dropped(self):
+        evaluator = self.evaluator()
+        bots = [PlannedBot('WWWWDD'), PlannedBot('SSS')]
+        # A late answer to an earlier call, and one from the future
+        evaluator.results.put((-1, 99, 1, True))
+        evaluator.results.put((5, 99, 1, True))
+        workers = evaluation.start_workers(1, self.address)
+        try:
+            results = evaluator.evaluate(bots, 30)
+        finally:
+            evaluator.stop_workers(len(workers))
+            for worker in workers:
+                worker.join()
+        for bot, result in zip(bots, results):
+            game = Maze(Layout.from_string(Layout.MEDIUM_STR))
+            expected = Session(game, bot).play(30)
+            self.assertEqual(
+                (result.score, result.turns, result.finished),
+                (expected.score, expected.turns, expected.finished))
+
+    def test_silent_workers_time_out(self):
+        evaluator = self.evaluator(timeout=0.1)
+        with self.assertRaises(RuntimeError):
+            evaluator.evaluate([PlannedBot('W')], 30)
+
+    def test_plans_round_trip(self):
+        bot = evaluation.decode_bot(evaluation.encode_bot(PlannedBot('WAS')))
+        self.assertIsInstance(bot.moves, Plan)
+        self.assertEqual(str(bot.moves), 'WAS')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Generated mazes must be solvable along their marked solution
+"""
+import unittest
+from games.game import Session
+from games.maze import Layout, Maze
+from players import PlannedBot
+
+STEPS = {'W': (0, -1), 'S': (0, 1), 'D': (1, 0), 'A': (-1, 0)}
+
+
+def solution_moves(layout):
+    """
+    Moves that follow the solution tiles from start to goal
+    """
+    rows = layout.rows()
+    pos = layout.start
+    previous = None
+    moves = []
+    while rows[pos[1]][pos[0]] != Layout.GOAL:
+        for move, (dx, dy) in sorted(STEPS.items()):
+            step = pos[0] + dx, pos[1] + dy
+            if (step != previous and
+                    rows[step[1]][step[0]] in (Layout.SOLUTION, Layout.GOAL)):
+                break
+        else:
+            raise AssertionError('Solution path breaks at {}'.format(pos))
+        moves.append(move)
+        previous, pos = pos, step
+    return moves
+
+
+class GenerateTest(unittest.TestCase):
+    def test_seeded(self):
+        self.assertEqual(
+            Layout.generate(31, 21, seed=4).rows(),
+            Layout.generate(31, 21, seed=4).rows())
+        self.assertNotEqual(
+            Layout.generate(31, 21, seed=4).rows(),
+            Layout.generate(31, 21, seed=5).rows())
+
+    def test_sizes_round_down_to_odd(self):
+        layout = Layout.generate(20, 16, seed=0)
+        self.assertEqual((layout.width, layout.height), (19, 15))
+        self.assertEqual(layout.start, (1, 13))
+        self.assertEqual(layout.goal, (17, 1))
+
+    def test_too_small(self):
+        for width, height in ((2, 20), (20, 2), (4, 6)):
+            with self.assertRaises(ValueError):
+                Layout.generate(width, height)
+
+    def test_walled_in(self):
+        rows = Layout.generate(21, 15, seed=2).rows()
+        self.assertEqual(rows[0], Layout.WALL * 21)
+        self.assertEqual(rows[-1], Layout.WALL * 21)
+        for row in rows:
+            self.assertEqual(row[0] + row[-1], Layout.WALL * 2)
+
+    def test_perfect_maze(self):
+        # Every open cell is reachable along exactly one path, so the
+        # passages form a tree
+        rows = Layout.generate(25, 19, seed=3).rows()
+        open_cells = set(
+            (x, y)
+            for y, row in enumerate(rows)
+            for x, tile in enumerate(row)
+            if tile != Layout.WALL
+        )
+        edges = sum(
+            (x + 1, y) in open_cells for x, y in open_cells) + sum(
+            (x, y + 1) in open_cells for x, y in open_cells)
+        self.assertEqual(edges, len(open_cells) - 1)
+
+    def test_solution_wins(self):
+        for seed in range(5):
+            layout = Layout.generate(31, 31, seed=seed)
+            moves = solution_moves(layout)
+            tiles = ''.join(layout.rows()).count(Layout.SOLUTION)
+            result = Session(Maze(layout), PlannedBot(moves)).play()
+            self.assertTrue(result.finished)
+            self.assertEqual(result.score, tiles + 1)
+            self.assertEqual(result.turns, len(moves))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Networks stay acyclic, and cycles are reported instead of looping
+"""
+import random
+import unittest
+from neat.network import CompiledNetwork, Network, Neuron
+
+
+def network(connections, middle=0):
+    return Network(
+        [Neuron() for _ in range(2)], [Neuron() for _ in range(2)],
+        [Neuron() for _ in range(middle)], connections)
+
+
+class CycleTest(unittest.TestCase):
+    def test_sort_orders_sources_first(self):
+        connections = [(0, 4, 1), (4, 5, 1), (5, 2, 1), (1, 5, 2)]
+        order = CompiledNetwork._sort(network(connections, 2))
+        self.assertEqual(sorted(order), list(range(6)))
+        position = dict((idx, pos) for pos, idx in enumerate(order))
+        for source, target, _ in connections:
+            self.assertLess(position[source], position[target])
+
+    def test_cycles_are_rejected(self):
+        cycles = (
+            [(4, 4, 1)],
+            [(4, 5, 1), (5, 4, 1)],
+            [(0, 4, 1), (4, 5, 1), (5, 2, 1), (2, 4, 2)],
+        )
+        for connections in cycles:
+            with self.assertRaises(ValueError):
+                network(connections, 2).compile()
+
+    def test_mutations_keep_networks_acyclic(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            candidate = network([])
+            for _ in range(60):
+                mutator = rng.choice([
+                    candidate.add_random_neuron,
+                    candidate.add_random_connection])
+                mutator(rng=rng)
+                # Raises if a mutation closed a cycle
+                candidate.compile()
+            for source, target, _ in candidate.connections:
+                self.assertFalse(candidate._reaches(target, source))
+
+    def test_reaches(self):
+        candidate = network([(0, 4, 1), (4, 2, 1)], 1)
+        self.assertTrue(candidate._reaches(0, 2))
+        self.assertFalse(candidate._reaches(2, 0))
+        self.assertFalse(candidate._reaches(1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
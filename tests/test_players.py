@@ -0,0 +1,87 @@
+"""
+Players and the plans they carry
+"""
+import pickle
+import unittest
+from neat.games import GameNetwork
+from neat.network import Neuron
+from players import NeatBot, Plan, PlannedBot
+
+
+def network_factory():
+    return GameNetwork(
+        [Neuron() for _ in range(4)], [Neuron() for _ in range(4)],
+        controls='WASD')
+
+
+class PlanTest(unittest.TestCase):
+    MOVES = 'WASDDSAWWD'
+
+    def test_round_trip(self):
+        for length in range(len(self.MOVES) + 1):
+            moves = self.MOVES[:length]
+            plan = Plan(moves)
+            self.assertEqual(str(plan), moves)
+            self.assertEqual(len(plan), length)
+            self.assertEqual(list(plan), list(moves))
+            # Four moves per byte, the last one partly filled
+            self.assertEqual(len(plan.data), (length + 3) // 4)
+
+    def test_appending_fills_the_last_byte(self):
+        for split in range(len(self.MOVES) + 1):
+            plan = Plan(self.MOVES[:split]) + self.MOVES[split:]
+            self.assertEqual(plan, Plan(self.MOVES))
+            self.assertEqual(hash(plan), hash(Plan(self.MOVES)))
+        self.assertEqual(str(Plan('WA') + Plan('SD')), 'WASD')
+
+    def test_padding_is_not_a_move(self):
+        # W packs to zero like the padding, only the length tells them apart
+        self.assertEqual(Plan('S').data, Plan('SWWW').data)
+        self.assertNotEqual(Plan('S'), Plan('SWWW'))
+        self.assertNotEqual(hash(Plan('S')), hash(Plan('SWWW')))
+        self.assertEqual(str(Plan('S')), 'S')
+        self.assertEqual(str(Plan('S') + 'A'), 'SA')
+
+    def test_indexing_and_slices(self):
+        plan = Plan(self.MOVES)
+        for idx in range(-len(self.MOVES), len(self.MOVES)):
+            self.assertEqual(plan[idx], self.MOVES[idx])
+        with self.assertRaises(IndexError):
+            plan[len(self.MOVES)]
+        self.assertEqual(plan[3:7], self.MOVES[3:7])
+        self.assertEqual(plan[5:], self.MOVES[5:])
+        self.assertEqual(plan[::-1], self.MOVES[::-1])
+
+    def test_unknown_moves_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Plan('WQ')
+        with self.assertRaises(ValueError):
+            Plan('WAS') + 'X'
+
+    def test_pickles(self):
+        plan = Plan(self.MOVES)
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(plan, protocol))
+            self.assertEqual(copy, plan)
+            self.assertEqual(str(copy), self.MOVES)
+        bot = pickle.loads(pickle.dumps(PlannedBot(self.MOVES)))
+        self.assertEqual(str(bot.moves), self.MOVES)
+
+
+class NeatBotTest(unittest.TestCase):
+    def test_needs_a_network(self):
+        with self.assertRaises(TypeError):
+            NeatBot()
+
+    def test_subclass_factory(self):
+        class MazeBot(NeatBot):
+            network_factory = staticmethod(network_factory)
+
+        bot = MazeBot()
+        self.assertEqual(bot.network.controls, list('WASD'))
+        child = bot.reproduce('WASD', 1, 1)
+        self.assertIsInstance(child, MazeBot)
+
+
+if __name__ == '__main__':
+    unittest.main()
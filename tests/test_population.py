@@ -0,0 +1,90 @@
+"""
+PopulationEvaluator must agree with every network's own traversal
+"""
+import random
+import unittest
+import numpy as np
+from neat.network import Network, Neuron
+from neat.population import PopulationEvaluator
+
+
+class Sensor(Neuron):
+    """
+    Input neuron reading its state from the game, here a list of states
+    """
+    def __init__(self, index):
+        self.index = index
+
+    def eval(self, hot, traversal):
+        return traversal.game[self.index]
+
+
+def population(rng, count=20, inputs=6, outputs=3):
+    """
+    Clones of one network mutated apart, as a trainer would breed them
+    """
+    base = Network(
+        [Sensor(idx) for idx in range(inputs)],
+        [Neuron() for _ in range(outputs)])
+    networks = []
+    for _ in range(count):
+        network = base.deep_copy()
+        for _ in range(rng.randint(0, 30)):
+            mutator = rng.choice(
+                [network.add_random_neuron, network.add_random_connection])
+            mutator(rng=rng)
+        networks.append(network)
+    return networks
+
+
+def random_games(rng, count, inputs=6):
+    states = (
+        Neuron.State.NEUTRAL, Neuron.State.POSITIVE, Neuron.State.NEGATIVE)
+    return [[rng.choice(states) for _ in range(inputs)] for _ in range(count)]
+
+
+class PopulationEvaluatorTest(unittest.TestCase):
+    def test_matches_traversal(self):
+        rng = random.Random(0)
+        for _ in range(10):
+            networks = population(rng)
+            evaluator = PopulationEvaluator(networks)
+            games = random_games(rng, len(networks))
+            outputs = evaluator.evaluate(evaluator.input_states(games))
+            for network, game, row in zip(networks, games, outputs):
+                traversal = network.traverse(game)
+                self.assertEqual(
+                    list(row[:network.num_outputs]),
+                    [traversal[node] for node in network.outputs])
+
+    def test_batches_of_game_states(self):
+        rng = random.Random(1)
+        networks = population(rng)
+        evaluator = PopulationEvaluator(networks)
+        batch = [
+            evaluator.input_states(random_games(rng, len(networks)))
+            for _ in range(4)
+        ]
+        outputs = evaluator.evaluate(np.stack(batch))
+        self.assertEqual(outputs.shape, (4, len(networks), 3))
+        for states, expected in zip(batch, outputs):
+            self.assertTrue((evaluator.evaluate(states) == expected).all())
+
+    def test_mixed_sizes_are_padded(self):
+        rng = random.Random(2)
+        networks = population(rng, 5, inputs=6, outputs=3)
+        networks += population(rng, 5, inputs=3, outputs=2)
+        evaluator = PopulationEvaluator(networks)
+        games = random_games(rng, len(networks))
+        outputs = evaluator.evaluate(evaluator.input_states(games))
+        for network, game, row in zip(networks, games, outputs):
+            traversal = network.traverse(game)
+            self.assertEqual(
+                list(row[:network.num_outputs]),
+                [traversal[node] for node in network.outputs])
+            # Missing outputs read the never connected padding node
+            self.assertFalse(row[network.num_outputs:].any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Terminal frame diffs must leave the screen showing the new frame
+"""
+import io
+import random
+import re
+import unittest
+from renderers import TerminalRenderer
+
+CONTROL = re.compile(r'\x1b\[(\d*)([ABCK])')
+
+
+def play(screen, output):
+    """
+    Apply terminal output to screen lines, the cursor starts at the start
+    of the line below them. Returns the lines and the cursor.
+    """
+    screen = list(screen)
+    line, column = len(screen), 0
+    idx = 0
+    while idx < len(output):
+        control = CONTROL.match(output, idx)
+        if control:
+            count, code = control.groups()
+            idx = control.end()
+            if code == 'A':
+                line -= int(count)
+            elif code == 'B':
+                line += int(count)
+            elif code == 'C':
+                column += int(count)
+            elif count == '2':
+                screen[line] = ''
+            else:
+                screen[line] = screen[line][:column]
+            continue
+        char = output[idx]
+        idx += 1
+        if char == '\r':
+            column = 0
+        elif char == '\n':
+            screen.extend([''] * (line + 1 - len(screen)))
+            line += 1
+            column = 0
+        else:
+            screen.extend([''] * (line + 1 - len(screen)))
+            row = screen[line].ljust(column)
+            screen[line] = row[:column] + char + row[column + 1:]
+            column += 1
+    return screen, (line, column)
+
+
+class DiffTest(unittest.TestCase):
+    diff = staticmethod(TerminalRenderer.Renderer._diff)
+
+    def assertShows(self, old, new):
+        screen, cursor = play(old, self.diff(old, new))
+        # Lines the frame no longer uses are blank
+        self.assertEqual(screen, new + [''] * (len(old) - len(new)))
+        self.assertEqual(cursor, (len(new), 0))
+
+    def test_unchanged_frame_writes_nothing(self):
+        output = io.StringIO()
+        renderer = TerminalRenderer.Renderer(output)
+        written = []
+        for _ in range(2):
+            renderer.reset_frame()
+            renderer.draw_text_array([u'abc', u'de'])
+            renderer.end_frame()
+            written.append(output.tell())
+        self.assertEqual(written[0], written[1])
+
+    def test_only_changed_cells_are_written(self):
+        output = self.diff(['xxxxxx', 'x *  x'], ['xxxxxx', 'x  * x'])
+        # From the first changed cell to the end of the line
+        self.assertEqual(output, '\x1b[1A\r\x1b[2C * x\x1b[1B\r')
+        self.assertShows(['xxxxxx', 'x *  x'], ['xxxxxx', 'x  * x'])
+
+    def test_shorter_and_longer_lines(self):
+        self.assertShows(['Score: 10', 'x'], ['Score: 9', 'xx'])
+        self.assertShows(['ab'], ['abcd'])
+
+    def test_frames_grow_and_shrink(self):
+        self.assertShows([], ['a', 'b'])
+        self.assertShows(['a'], ['a', 'b', 'c'])
+        self.assertShows(['a', 'b', 'c'], ['a'])
+        self.assertShows(['a', 'b'], [])
+
+    def test_random_frames(self):
+        rng = random.Random(0)
+
+        def frame():
+            return [
+                ''.join(rng.choice('x *') for _ in range(rng.randint(0, 8)))
+                for _ in range(rng.randint(0, 6))
+            ]
+        for _ in range(500):
+            self.assertShows(frame(), frame())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Trainer runs outside the evaluation modes: islands and resuming
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from players import PlannedBot
+from renderers import NullRenderer
+from tests.test_equivalence import game_factory
+from trainer import BotTrainer
+
+
+def trainer(**kwargs):
+    kwargs.setdefault('max_turns', 30)
+    return BotTrainer(
+        game_factory, PlannedBot, 30, 2, goal_score=13,
+        progress_renderer_factory=NullRenderer, **kwargs)
+
+
+def summary(generations, result):
+    return (
+        generations, result.score, result.turns, result.finished,
+        str(result.player.moves))
+
+
+class IslandsTest(unittest.TestCase):
+    def test_seeded_islands_find_the_same_winner(self):
+        first = summary(*trainer().breed_islands(3, 2, seed=11))
+        self.assertTrue(first[3])
+        # Migrations happen every 2 generations
+        self.assertEqual(first[0] % 2, 0)
+        self.assertEqual(
+            summary(*trainer().breed_islands(3, 2, seed=11)), first)
+
+    def test_stops_after_max_generations(self):
+        # Too few turns to reach the goal
+        generations, result = trainer(
+            max_turns=5, max_generations=4).breed_islands(2, 2, seed=1)
+        self.assertFalse(result.finished)
+        self.assertEqual(generations, 6)
+        self.assertEqual(result.score, 5)
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'checkpoint')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_resuming_the_last_generation_stops(self):
+        # Too few turns to reach the goal, so every generation is saved
+        options = dict(
+            max_turns=5, max_generations=2, checkpoint_path=self.path,
+            checkpoint_interval=1, seed=3)
+        expected = summary(*trainer(**options).breed_best_bot())
+        checkpoint = BotTrainer.load_checkpoint(self.path)
+        self.assertEqual(checkpoint['generations'], 2)
+
+        resumed = trainer(**options)
+
+        def fail(*args):
+            raise AssertionError('Trained past max_generations')
+        resumed._breed = resumed.test_generation = fail
+        self.assertEqual(
+            summary(*resumed.breed_best_bot(checkpoint)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,16 @@
 """
 Classes to train genetic bots
 """
-from time import sleep
+from contextlib import contextmanager
+from multiprocessing import Pipe, Pool, Process
+from time import time
+import os
+import pickle
+import random
+import zlib
+from caches import LRUCache
 from games.game import Session
+from profiling import NullProfiler
 from renderers import NullRenderer, TerminalRenderer
 
 
@@ -21,7 +29,22 @@ class BotTrainer(object):
             max_turns=100,
             goal_score=None,
             game_renderer_factory=NullRenderer,
-            progress_renderer_factory=TerminalRenderer
+            progress_renderer_factory=TerminalRenderer,
+            workers=None,
+            render_every=1,
+            render_champion=False,
+            batch_factory=None,
+            prefix_cache_size=0,
+            progress_interval=0.1,
+            outcome_cache_size=0,
+            stop_policies=(),
+            checkpoint_path=None,
+            checkpoint_interval=100,
+            seed=None,
+            profiler=None,
+            evaluator=None,
+            dedup=True,
+            genome_cache_size=0
     ):
         # TODO: Reduce state
         self.game_factory = game_factory
@@ -34,70 +57,597 @@ class BotTrainer(object):
         self.goal_score = float(goal_score) if goal_score is not None else None
         self.game_renderer_factory = game_renderer_factory
         self.progress_renderer_factory = progress_renderer_factory
+        self.workers = workers
+        self._pool = None
+        self.render_every = render_every
+        self.render_champion = render_champion
+        self._sessions = 0
+        self.batch_factory = batch_factory
+        self.prefix_cache = (
+            LRUCache(prefix_cache_size) if prefix_cache_size else None)
+        self.progress_interval = progress_interval
+        self.stop_policies = stop_policies
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        # All breeding randomness comes from here, so a seed fixes the run
+        self.rng = random.Random(seed)
+        self.outcome_cache = (
+            LRUCache(outcome_cache_size) if outcome_cache_size else None)
+        self._last_progress = None
+        self.last_stats = None
+        self.profiler = profiler or NullProfiler()
+        # e.g. evaluation.RemoteEvaluator, scores generations elsewhere
+        self.evaluator = evaluator
+        # Identical genomes in a generation are only tested once, and with
+        # a genome cache not again in later generations either (games must
+        # be deterministic)
+        self.dedup = dedup
+        self.genome_cache = (
+            LRUCache(genome_cache_size) if genome_cache_size else None)
+        if stop_policies and (
+                batch_factory is not None or evaluator is not None):
+            raise ValueError(
+                'Stop policies only apply to sessions played here, not to '
+                'batch or remote evaluation')
 
-    def test_bot(self, bot, render_context):
+    def test_bot(self, bot, render_context=None, prefix=None, best=None):
         """
-        Test the bot against the game
+        Test the bot against the game (headless without a render context),
+        stop policies may cut it short once it can't beat best
         """
-        game = self.game_factory()
-        session = Session(game, bot, render_context)
-        return session.play(self.max_turns)
+        profiler = self.profiler
+        with profiler.stage('play'):
+            result, ticks = _play_bot(
+                profiler.timed('game_construction', self.game_factory), bot,
+                self.max_turns, profiler.render_context(render_context),
+                prefix, self._outcome_cache(), self.stop_policies, best)
+        profiler.count('sessions')
+        profiler.count('ticks', ticks)
+        return result
 
-    def test_generation(self, bots, min_result, render_context):
+    def test_generation(self, bots, min_result, render_context, parent=None):
         """
-        Test a set of bots for the best
+        Test a set of bots for the best, bots bred from parent can resume
+        from its cached plan
         """
-        for bot in bots:
-            result = self.test_bot(bot, render_context)
+        prefix = self.plan_prefix(parent)
+        # Result fields only, full results would keep every game alive
+        results = [None] * len(bots)
+        duplicate_of = [None] * len(bots)
+        stats = GenerationStats()
+        keys, pending = self._dedup(bots, results, duplicate_of, stats)
+        self.profiler.count('duplicates', stats.duplicates)
+        tested = None
+        if self.batch_factory is not None:
+            with self.profiler.stage('evaluate'):
+                tested = self._test_batch([bots[_] for _ in pending])
+        elif self.evaluator is not None:
+            with self.profiler.stage('evaluate'):
+                tested = self.evaluator.evaluate(
+                    [bots[_] for _ in pending], self.max_turns)
+            self.profiler.count('ticks', sum(
+                _played_turns(result.turns, self.max_turns)
+                for result in tested))
+        elif self._pool is not None:
+            with self.profiler.stage('evaluate'):
+                tested = self._test_parallel(
+                    [bots[_] for _ in pending], prefix, min_result)
+        if tested is not None:
+            self.profiler.count('sessions', len(tested))
+            for bot_id, result in zip(pending, tested):
+                results[bot_id] = _result_fields(result)
+        for bot_id, bot in enumerate(bots):
+            fields = self._known_fields(results, duplicate_of, bot_id)
+            if fields is None:
+                result = self.test_bot(
+                    bot, self._sample_context(render_context), prefix,
+                    min_result)
+            else:
+                result = Session.Result(*fields)
+            self._share(keys, results, bot_id, result)
+            stats.add(result)
             if result > min_result:
+                # Only the champion holds on to its bot (and game)
+                result.bot_id = bot_id
+                result.player = bot
                 min_result = result
+        self.last_stats = stats
         return min_result
 
-    def breed_best_bot(self):
+    def _dedup(self, bots, results, duplicate_of, stats):
         """
-        Breeds the best random bot inside parameters
+        Genome keys of the bots and the ids of the bots that need testing.
+        Result fields of known genomes are filled in, duplicates get the id
+        of the bot they copy in duplicate_of.
         """
+        keys = [None] * len(bots)
+        if not self.dedup:
+            return keys, list(range(len(bots)))
+        pending = []
+        first = {}
+        for bot_id, bot in enumerate(bots):
+            key = keys[bot_id] = bot.genome_key()
+            if key is None:
+                pending.append(bot_id)
+            elif key in first:
+                duplicate_of[bot_id] = first[key]
+                stats.duplicates += 1
+            else:
+                first[key] = bot_id
+                fields = None
+                if self.genome_cache is not None:
+                    fields = self.genome_cache.get(key)
+                if fields is None:
+                    pending.append(bot_id)
+                else:
+                    results[bot_id] = fields
+                    stats.duplicates += 1
+        return keys, pending
+
+    @staticmethod
+    def _known_fields(results, duplicate_of, bot_id):
+        """
+        Result fields for a bot if it needs no testing, a duplicate takes
+        those of the bot it copies (it can never beat that bot)
+        """
+        if duplicate_of[bot_id] is not None:
+            return results[duplicate_of[bot_id]]
+        return results[bot_id]
+
+    def _share(self, keys, results, bot_id, result):
+        """
+        Record a bot's result fields for its duplicates and the genome
+        cache, which skips results cut short by a stop policy
+        """
+        results[bot_id] = _result_fields(result)
+        if (self.genome_cache is not None and keys[bot_id] is not None and
+                not result.stopped):
+            self.genome_cache.put(keys[bot_id], results[bot_id])
+
+    def _reuses_states(self):
+        """
+        Sessions may resume from cached prefixes and outcomes unless a stop
+        policy has to see every state from the start
+        """
+        return not any(
+            policy.needs_history for policy in self.stop_policies)
+
+    def _outcome_cache(self):
+        return self.outcome_cache if self._reuses_states() else None
+
+    def plan_prefix(self, parent):
+        """
+        Game snapshot and turn count after the parent's planned moves
+        """
+        if (self.prefix_cache is None or
+                getattr(parent, 'moves', None) is None or
+                not self._reuses_states()):
+            return None
+        key = parent.moves
+        prefix = self.prefix_cache.get(key)
+        if prefix is None:
+            game = self.game_factory()
+            turns = 0
+            for move in parent.moves[:self.max_turns]:
+                if not game.in_progress():
+                    break
+                game.tick(move)
+                turns += 1
+            prefix = game.snapshot(), turns
+            self.prefix_cache.put(key, prefix)
+        return prefix
+
+    def _sample_context(self, render_context):
+        """
+        Pick the render context for the next session, None means headless
+        """
+        if not self._is_visible(render_context) or not self.render_every:
+            return None
+        self._sessions += 1
+        if self._sessions % self.render_every:
+            return None
+        return render_context
+
+    @staticmethod
+    def _is_visible(render_context):
+        return (
+            render_context is not None and
+            not isinstance(render_context, NullRenderer)
+        )
+
+    def _test_batch(self, bots):
+        """
+        Test a set of planned bots in one lockstep batch game
+        """
+        plans = [getattr(bot, 'moves', None) for bot in bots]
+        if None in plans:
+            raise TypeError(
+                'Batch evaluation plays planned moves, {} has none'.format(
+                    type(bots[plans.index(None)]).__name__))
+        engine = self.batch_factory(len(bots))
+        scores, turns, wins = engine.play(plans, self.max_turns)
+        self.profiler.count('ticks', sum(
+            _played_turns(int(turn), self.max_turns) for turn in turns))
+        return [
+            Session.Result(int(score), int(turn), bool(win))
+            for score, turn, win in zip(scores, turns, wins)
+        ]
+
+    def _test_parallel(self, bots, prefix=None, best=None):
+        """
+        Test a set of bots in the worker pool, results are in bot order
+        """
+        if best is not None:
+            best = _result_fields(best)
+        jobs = [
+            (
+                self.game_factory, bot, self.max_turns, prefix,
+                self.stop_policies, best
+            )
+            for bot in bots
+        ]
+        chunksize = max(1, len(jobs) // (self.workers * 4))
+        scores = self._pool.map(_pool_job, jobs, chunksize)
+        self.profiler.count('ticks', sum(score[-1] for score in scores))
+        return [
+            Session.Result(*score[:3], stopped=score[3]) for score in scores]
+
+    def breed_best_bot(self, checkpoint=None):
+        """
+        Breeds the best random bot inside parameters, optionally continuing
+        from a checkpoint (see load_checkpoint)
+        """
+        generations, best_bot, best_result, parent, bots = self._start(
+            checkpoint)
+        if bots is None:
+            return generations, best_result
+        progress_renderer = self.progress_renderer_factory()
+        game_renderer = self.game_renderer_factory()
+        with self.worker_pool():
+            with progress_renderer.render_context() as progress_ctx:
+                with game_renderer.render_context() as game_ctx:
+                    while True:
+                        self.profiler.start_generation(generations)
+                        self._do_progress(
+                            generations, best_result, progress_ctx)
+                        best_bot, best_result = self._generation(
+                            bots, parent, best_bot, best_result, game_ctx)
+                        if best_result.finished:
+                            break
+                        self._checkpoint(generations, best_result)
+                        generations += 1
+                        if generations > self.max_generations:
+                            break
+                        else:
+                            parent = best_bot
+                            bots = self._breed(parent)
+                self._do_progress(
+                    generations, best_result, progress_ctx, force=True)
+        self.profiler.finish()
+        return generations, best_result
+
+    def _start(self, checkpoint):
+        """
+        Generation number, champion, its result, parent and bots of the
+        first generation to test, fresh or resumed from a checkpoint. Bots
+        are None if the checkpoint was the last generation.
+        """
+        if checkpoint is None:
+            best_result = Session.Result.zero()
+            best_bot = self.bot_factory()
+            best_result.player = best_bot
+            return 0, best_bot, best_result, None, [best_bot]
+        generations, best_bot, best_result = self._restore(checkpoint)
+        generations += 1
+        if generations > self.max_generations:
+            return generations, best_bot, best_result, best_bot, None
+        return (
+            generations, best_bot, best_result, best_bot,
+            self._breed(best_bot))
+
+    def _checkpoint(self, generations, best_result):
+        """
+        Save the training state every checkpoint_interval generations
+        """
+        if (self.checkpoint_path is None or
+                generations % self.checkpoint_interval):
+            return
+        state = {
+            'generations': generations,
+            'best_bot': best_result.player,
+            'best_result': _result_fields(best_result),
+            'random_state': self.rng.getstate(),
+        }
+        data = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+        # Write then rename so a crash never leaves a partial checkpoint
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'wb') as checkpoint_file:
+            checkpoint_file.write(data)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.rename(temp_path, self.checkpoint_path)
+
+    @staticmethod
+    def load_checkpoint(path):
+        """
+        Read a checkpoint written during breed_best_bot
+        """
+        with open(path, 'rb') as checkpoint_file:
+            return pickle.loads(zlib.decompress(checkpoint_file.read()))
+
+    def _restore(self, checkpoint):
+        """
+        Resume training state from a checkpoint
+        """
+        self.rng.setstate(checkpoint['random_state'])
+        best_result = Session.Result(*checkpoint['best_result'])
+        best_result.player = checkpoint['best_bot']
+        return checkpoint['generations'], best_result.player, best_result
+
+    def breed_islands(self, islands, migration_interval=10, seed=None):
+        """
+        Breeds the best bot with independent populations in separate
+        processes, champions migrate between them every migration_interval
+        generations
+        """
+        if seed is None:
+            seed = self.rng.getrandbits(32)
+        connections = []
+        processes = []
+        for island in range(islands):
+            connection, island_connection = Pipe()
+            process = Process(
+                target=_island, args=(self, island_connection, seed + island))
+            process.daemon = True
+            process.start()
+            connections.append(connection)
+            processes.append(process)
+
         best_result = Session.Result.zero()
-        best_bot = self.bot_factory()
-        best_result.player = best_bot
-        bots = [best_bot]
+        best_result.player = self.bot_factory()
         generations = 0
-        with self.progress_renderer_factory().render_context() as progress_ctx:
-            with self.game_renderer_factory().render_context() as game_ctx:
+        try:
+            progress_renderer = self.progress_renderer_factory()
+            with progress_renderer.render_context() as progress_ctx:
                 while True:
                     self._do_progress(generations, best_result, progress_ctx)
-                    next_best_result = self.test_generation(
-                        bots, best_result, game_ctx)
-                    next_best_bot = next_best_result.player
-                    if (next_best_bot is not None and
-                            next_best_result > best_result):
-                        best_result = next_best_result
-                        best_bot = next_best_bot
+                    migrant = best_result.player, _result_fields(best_result)
+                    for connection in connections:
+                        connection.send((migrant, migration_interval))
+                    for connection in connections:
+                        bot, fields = connection.recv()
+                        result = Session.Result(*fields)
+                        if result > best_result:
+                            result.player = bot
+                            best_result = result
+                    generations += migration_interval
                     if best_result.finished:
                         break
-                    generations += 1
                     if generations > self.max_generations:
                         break
-                    else:
-                        bots = self._breed(best_bot)
+                self._do_progress(
+                    generations, best_result, progress_ctx, force=True)
+        finally:
+            for connection in connections:
+                connection.send(None)
+            for process in processes:
+                process.join()
         return generations, best_result
 
-    def _do_progress(self, generation, best_result, render_context):
+    def _generation(self, bots, parent, best_bot, best_result, game_ctx):
+        """
+        Test one generation, returns the (possibly new) champion
+        """
+        next_best_result = self.test_generation(
+            bots, best_result, game_ctx, parent)
+        next_best_bot = next_best_result.player
+        if next_best_bot is not None and next_best_result > best_result:
+            best_result = next_best_result
+            best_bot = next_best_bot
+            self._show_champion(best_bot, game_ctx)
+        return best_bot, best_result
+
+    def _show_champion(self, bot, render_context):
+        """
+        Replay a new champion on screen if requested
+        """
+        if self.render_champion and self._is_visible(render_context):
+            self.test_bot(bot, render_context)
+
+    @contextmanager
+    def worker_pool(self):
+        """
+        Run generations in a process pool while active (if workers > 1)
+        """
+        if not self.workers or self.workers < 2 or self._pool is not None:
+            yield self._pool
+            return
+        self._pool = Pool(self.workers)
+        try:
+            yield self._pool
+        finally:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _do_progress(
+            self, generation, best_result, render_context, force=False):
+        # Redraw at most once per progress_interval seconds (unless forced,
+        # e.g. for the final state), None disables
+        if self.progress_interval is None:
+            return
+        now = time()
+        if (not force and self._last_progress is not None and
+                now - self._last_progress < self.progress_interval):
+            return
+        self._last_progress = now
+
         msg = 'Testing generation {}'.format(generation)
         if self.goal_score is not None:
             msg += ' ({:.2%})'.format(best_result.score / self.goal_score)
         msg += '...'
+        if self.last_stats is not None and self.last_stats.count:
+            msg += ' (mean {:.1f}, p90 {}, {:.0%} finished)'.format(
+                self.last_stats.mean(), self.last_stats.percentile(90),
+                self.last_stats.finish_rate())
+        if self.last_stats is not None and self.last_stats.duplicates:
+            msg += ' [{:.0%} duplicates]'.format(
+                self.last_stats.duplicate_rate())
+        if self.genome_cache is not None:
+            msg += ' [genome cache {:.0%} hits]'.format(
+                self.genome_cache.hit_rate())
+        if self.outcome_cache is not None:
+            msg += ' [outcome cache {} hits, {} misses]'.format(
+                self.outcome_cache.hits, self.outcome_cache.misses)
 
-        render_context.reset_frame()
-        render_context.draw_text_array([msg])
-        sleep(0.5)
+        with self.profiler.stage('progress'):
+            render_context.reset_frame()
+            render_context.draw_text_array([msg])
+            render_context.end_frame()
 
     def _breed(self, bot):
-        bots = []
-        # HACK: Shouldn't need to construct a game instance for this
-        controls = self.game_factory().player_controls()
-        for _ in xrange(self.generation_size):
-            bots.append(bot.reproduce(
-                controls, self.min_mutations, self.max_mutations
-            ))
+        with self.profiler.stage('breed'):
+            bots = []
+            # HACK: Shouldn't need to construct a game instance for this
+            game_factory = self.profiler.timed(
+                'game_construction', self.game_factory)
+            controls = game_factory().player_controls()
+            for _ in range(self.generation_size):
+                # Each child gets its own stream so its mutations don't
+                # depend on how much randomness its siblings used
+                rng = random.Random(self.rng.getrandbits(64))
+                child = bot.reproduce(
+                    controls, self.min_mutations, self.max_mutations, rng
+                )
+                self.profiler.count('mutations', child.mutations)
+                bots.append(child)
         return bots
+
+
+class GenerationStats(object):
+    """
+    Streaming summary of a generation's results
+    """
+    def __init__(self):
+        self.count = 0
+        self.finished = 0
+        self.total = 0
+        self.best = None
+        # Results shared with an identical genome instead of tested
+        self.duplicates = 0
+        # Scores are small integers, so a histogram gives exact percentiles
+        self.histogram = {}
+
+    def add(self, result):
+        """
+        Account for one result
+        """
+        self.count += 1
+        self.finished += bool(result.finished)
+        self.total += result.score
+        self.histogram[result.score] = self.histogram.get(result.score, 0) + 1
+        if self.best is None or result.score > self.best:
+            self.best = result.score
+
+    def mean(self):
+        """
+        Mean score
+        """
+        return self.total / float(self.count) if self.count else 0.0
+
+    def percentile(self, pct):
+        """
+        Score at the given percentile (nearest rank)
+        """
+        rank = max(1, -(-pct * self.count // 100))
+        seen = 0
+        for score in sorted(self.histogram):
+            seen += self.histogram[score]
+            if seen >= rank:
+                return score
+        return None
+
+    def finish_rate(self):
+        """
+        Fraction of sessions that finished the game
+        """
+        return self.finished / float(self.count) if self.count else 0.0
+
+    def duplicate_rate(self):
+        """
+        Fraction of bots whose genome was already tested
+        """
+        return self.duplicates / float(self.count) if self.count else 0.0
+
+
+def _result_fields(result):
+    """
+    Nested classes don't pickle, so results travel as plain fields
+    """
+    return result.score, result.turns, result.finished
+
+
+def _played_turns(turns, max_turns):
+    """
+    Turns a whole session simulated, a timeout reports max_turns + 1
+    """
+    return turns if max_turns is None else min(turns, max_turns)
+
+
+def _island(trainer, connection, seed):
+    """
+    Island process: evolve its own lineage between migrations
+    """
+    trainer.rng.seed(seed)
+    best_result = Session.Result.zero()
+    best_bot = best_result.player = trainer.bot_factory()
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        (migrant, fields), generations = message
+        migrant_result = Session.Result(*fields)
+        if migrant_result > best_result:
+            best_bot = migrant_result.player = migrant
+            best_result = migrant_result
+        for _ in range(generations):
+            bots = trainer._breed(best_bot)
+            best_bot, best_result = trainer._generation(
+                bots, best_bot, best_bot, best_result, None)
+            if best_result.finished:
+                break
+        connection.send((best_bot, _result_fields(best_result)))
+
+
+def _play_bot(
+        game_factory, bot, max_turns, render_context, prefix,
+        outcome_cache=None, stop_policies=(), best=None):
+    """
+    Play one bot, resuming from a (snapshot, turns) prefix if given.
+    Returns the result and the number of turns actually simulated.
+    """
+    game = game_factory()
+    session = Session(
+        game, bot, render_context, outcome_cache, stop_policies, best)
+    if prefix is None:
+        result = session.play(max_turns)
+    else:
+        state, turns = prefix
+        game.restore(state)
+        result = session.play(max_turns, turns + 1)
+    return result, session.ticks
+
+
+def _pool_job(job):
+    """
+    Pool worker: play one bot and send back only picklable result fields,
+    whether a stop policy cut it short and the turns simulated
+    """
+    game_factory, bot, max_turns, prefix, stop_policies, best = job
+    if best is not None:
+        best = Session.Result(*best)
+    result, ticks = _play_bot(
+        game_factory, bot, max_turns, None, prefix, None, stop_policies,
+        best)
+    return (
+        result.score, result.turns, result.finished, result.stopped, ticks)